@@ -0,0 +1,250 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import mmap
+import struct
+
+from lldpreport import snapshot
+
+# A binary report is laid out as:
+#
+#   header        magic, node count, string count, string table offset
+#   node index    (node UUID string, record offset, record length) for
+#                 each node, sorted by node UUID
+#   node records  interface count, then for each interface its record
+#                 length, name string, binding count and (field string,
+#                 value string) pairs
+#   string table  string count + 1 offsets, then the UTF-8 strings
+#
+# Names, fields and json encoded values are stored once in the string
+# table and referred to by number, so repeated VLAN lists, MTUs and
+# switch names cost four bytes each.
+REPORT_MAGIC = b'LLDPRPT1'
+HEADER = struct.Struct('<8sIIQ')
+INDEX_ENTRY = struct.Struct('<IQI')
+COUNT = struct.Struct('<I')
+INTERFACE = struct.Struct('<III')
+BINDING = struct.Struct('<II')
+STRING_OFFSET = struct.Struct('<Q')
+
+
+def is_binary_report(path):
+    with open(path, 'rb') as fp:
+        return fp.read(len(REPORT_MAGIC)) == REPORT_MAGIC
+
+
+class _StringTable():
+
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+    def add(self, string):
+        string_id = self.ids.get(string)
+        if string_id is None:
+            string_id = self.ids[string] = len(self.strings)
+            self.strings.append(string)
+        return string_id
+
+
+def encode_report(report):
+    """Return a report, as written by save, in the binary format."""
+    strings = _StringTable()
+    records = []
+    for node_id in sorted(report):
+        interfaces = report[node_id]
+        parts = [COUNT.pack(len(interfaces))]
+        for intf_name, bindings in sorted(interfaces.items()):
+            fields = b''.join(
+                BINDING.pack(strings.add(field),
+                             strings.add(json.dumps(value, sort_keys=True)))
+                for field, value in sorted(bindings.items()))
+            parts.append(INTERFACE.pack(INTERFACE.size + len(fields),
+                                        strings.add(intf_name),
+                                        len(bindings)))
+            parts.append(fields)
+        records.append((strings.add(node_id), b''.join(parts)))
+
+    offset = HEADER.size + INDEX_ENTRY.size * len(records)
+    index = []
+    for node_string, record in records:
+        index.append(INDEX_ENTRY.pack(node_string, offset, len(record)))
+        offset += len(record)
+
+    encoded = [string.encode('utf-8') for string in strings.strings]
+    string_offsets = [0]
+    for data in encoded:
+        string_offsets.append(string_offsets[-1] + len(data))
+
+    return b''.join(
+        [HEADER.pack(REPORT_MAGIC, len(records), len(encoded), offset)] +
+        index + [record for node_string, record in records] +
+        [STRING_OFFSET.pack(string_offset)
+         for string_offset in string_offsets] + encoded)
+
+
+def write_report(path, report):
+    """Write a report in the binary format."""
+    snapshot.write_file(path, encode_report(report))
+
+
+class BinaryReport():
+    """Read nodes from a binary report without loading the whole file.
+
+    The file is memory mapped. Looking up a node is a binary search of
+    the node index, and only the record of that node and the strings it
+    refers to are read.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as fp:
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.node_count, self.string_count, strings_offset = \
+            HEADER.unpack_from(self.map, 0)
+        if magic != REPORT_MAGIC:
+            self.map.close()
+            raise ValueError("%s is not a binary LLDP report" % path)
+        self.strings_offset = strings_offset
+        self.strings_data = strings_offset + \
+            STRING_OFFSET.size * (self.string_count + 1)
+        self._strings = {}
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def string(self, string_id):
+        string = self._strings.get(string_id)
+        if string is None:
+            start, end = struct.unpack_from(
+                '<QQ', self.map,
+                self.strings_offset + STRING_OFFSET.size * string_id)
+            string = self.map[self.strings_data + start:
+                              self.strings_data + end].decode('utf-8')
+            self._strings[string_id] = string
+        return string
+
+    def _entry(self, position):
+        return INDEX_ENTRY.unpack_from(
+            self.map, HEADER.size + INDEX_ENTRY.size * position)
+
+    def node_ids(self):
+        return [self.string(self._entry(position)[0])
+                for position in range(self.node_count)]
+
+    def _find(self, node_id):
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            entry = self._entry(middle)
+            middle_id = self.string(entry[0])
+            if middle_id == node_id:
+                return entry
+            if middle_id < node_id:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+
+    def __contains__(self, node_id):
+        return self._find(node_id) is not None
+
+    def node(self, node_id, interface=None):
+        """Return the interface bindings of a node, or None.
+
+        If interface is given, only that interface is decoded.
+        """
+        entry = self._find(node_id)
+        if entry is None:
+            return None
+
+        offset = entry[1]
+        count, = COUNT.unpack_from(self.map, offset)
+        offset += COUNT.size
+        interfaces = {}
+        for i in range(count):
+            length, name_id, binding_count = INTERFACE.unpack_from(
+                self.map, offset)
+            intf_name = self.string(name_id)
+            if interface is None or interface == intf_name:
+                bindings = {}
+                position = offset + INTERFACE.size
+                for j in range(binding_count):
+                    field_id, value_id = BINDING.unpack_from(self.map,
+                                                             position)
+                    bindings[self.string(field_id)] = json.loads(
+                        self.string(value_id))
+                    position += BINDING.size
+                interfaces[intf_name] = bindings
+            offset += length
+        return interfaces
+
+    def report(self):
+        """Return the whole report, as written by save."""
+        return dict((node_id, self.node(node_id))
+                    for node_id in self.node_ids())
+
+
+class JsonReport():
+    """Read nodes from a json report through the BinaryReport methods."""
+
+    def __init__(self, path):
+        with open(path, 'r') as fp:
+            self.nodes = json.load(fp)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def node_ids(self):
+        return sorted(self.nodes)
+
+    def __contains__(self, node_id):
+        return node_id in self.nodes
+
+    def node(self, node_id, interface=None):
+        interfaces = self.nodes.get(node_id)
+        if interfaces is None or interface is None:
+            return interfaces
+        return dict((intf_name, bindings)
+                    for intf_name, bindings in interfaces.items()
+                    if intf_name == interface)
+
+    def report(self):
+        return self.nodes
+
+
+def open_report(path):
+    """Open a report written by save, in json or the binary format."""
+    if is_binary_report(path):
+        return BinaryReport(path)
+    return JsonReport(path)
+
+
+def load_report(path):
+    """Load a whole report written by save, in either format."""
+    with open_report(path) as report:
+        return report.report()
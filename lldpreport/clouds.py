@@ -0,0 +1,93 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Where clouds.yaml is looked for, in order, as by the openstack client
+CLOUDS_FILES = [
+    'clouds.yaml',
+    os.path.join(os.path.expanduser('~'), '.config', 'openstack',
+                 'clouds.yaml'),
+    '/etc/openstack/clouds.yaml',
+]
+
+
+class ConfigFileError(Exception):
+    """Raised when a configuration file cannot be read."""
+
+
+class CloudConfigError(ConfigFileError):
+    """Raised when a cloud profile cannot be found or read."""
+
+
+def load_config_file(path):
+    """Load a json or, if PyYAML is installed, yaml file.
+
+    Files not named .json are read as yaml, which json is a subset of,
+    when PyYAML is installed.
+    """
+    with open(path, 'r') as fp:
+        if path.endswith('.json'):
+            return json.load(fp)
+        if yaml is not None:
+            return yaml.safe_load(fp)
+        if path.endswith(('.yaml', '.yml')):
+            raise ConfigFileError("PyYAML is required to read %s" % path)
+        return json.load(fp)
+
+
+def find_clouds_file():
+    path = os.environ.get('OS_CLIENT_CONFIG_FILE')
+    if path:
+        return path
+    for path in CLOUDS_FILES:
+        if os.path.exists(path):
+            return path
+    raise CloudConfigError("No clouds.yaml found in %s" %
+                           ", ".join(CLOUDS_FILES))
+
+
+def load_clouds(path=None):
+    """Return the cloud profiles of a clouds.yaml or clouds.json file."""
+    path = path or find_clouds_file()
+    return (load_config_file(path) or {}).get('clouds', {})
+
+
+def os_config(cloud_profiles, name):
+    """Return the credentials of a named cloud profile.
+
+    They are returned in the format of LldpReporter.get_os_config.
+    """
+    cloud = cloud_profiles.get(name)
+    if cloud is None:
+        raise CloudConfigError("Cloud %s is not in clouds.yaml" % name)
+
+    auth = cloud.get('auth', {})
+    config = {
+        'os_username': auth.get('username'),
+        'os_password': auth.get('password'),
+        'os_auth_url': auth.get('auth_url'),
+        'os_tenant_name': auth.get('project_name') or
+        auth.get('tenant_name'),
+    }
+    if cloud.get('region_name'):
+        config['os_region_name'] = cloud['region_name']
+    return config
@@ -0,0 +1,237 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import logging
+import random
+import threading
+import time
+
+LOG = logging.getLogger(__name__)
+
+# Requests per second allowed to each endpoint, and the burst above it
+FETCH_RATE = 20.0
+FETCH_BURST = 20
+
+# Maximum number of requests in flight to each endpoint
+FETCH_CONCURRENCY = 8
+
+# Retries of a failed request, with exponential backoff in seconds
+FETCH_RETRIES = 5
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 30.0
+
+# Consecutive failures that open the circuit of an endpoint, and the
+# seconds it stays open before a trial request is let through
+BREAKER_THRESHOLD = 10
+BREAKER_RESET = 30.0
+
+# Seconds between checks while another request is trying an open circuit,
+# and the longest a request waits for a circuit to close
+BREAKER_POLL = 1.0
+BREAKER_MAX_WAIT = 300.0
+
+# HTTP status codes of responses that are worth retrying
+RETRY_STATUS_CODES = frozenset([408, 429, 500, 502, 503, 504])
+
+
+class CircuitOpenError(Exception):
+    """Raised when an endpoint stays failing and requests are not sent."""
+
+
+def is_retryable(e):
+    """Return whether a failed request may succeed if retried."""
+    status = getattr(e, 'http_status', None)
+    if status is None:
+        status = getattr(getattr(e, 'response', None), 'status_code', None)
+    if status is not None:
+        return status in RETRY_STATUS_CODES
+
+    # Connection errors and timeouts from requests and keystoneauth do not
+    # share a base class with a status code
+    name = type(e).__name__
+    return (isinstance(e, (IOError, OSError)) or 'Timeout' in name or
+            'Connect' in name)
+
+
+class TokenBucket():
+    """Token bucket limiting the rate of requests."""
+
+    def __init__(self, rate=FETCH_RATE, burst=FETCH_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.time()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take a token, waiting until one is available."""
+        while True:
+            with self._lock:
+                now = time.time()
+                self.tokens = min(self.burst, self.tokens +
+                                  (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class CircuitBreaker():
+    """Stop sending requests to an endpoint that keeps failing.
+
+    After threshold consecutive failures the circuit opens and requests
+    wait. Once reset_timeout has passed one trial request is let through,
+    and its result closes or reopens the circuit.
+    """
+
+    def __init__(self, threshold=BREAKER_THRESHOLD,
+                 reset_timeout=BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    def check(self):
+        """Return the seconds to wait before sending a request, or 0."""
+        with self._lock:
+            if self.opened is None:
+                return 0
+            if self.trial:
+                return min(BREAKER_POLL, self.reset_timeout)
+            remaining = self.opened + self.reset_timeout - time.time()
+            if remaining <= 0:
+                self.trial = True
+                return 0
+            return remaining
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.trial or self.failures >= self.threshold:
+                self.opened = time.time()
+                self.trial = False
+
+
+class Endpoint():
+    """Rate limit, concurrency cap and circuit breaker of one endpoint."""
+
+    def __init__(self, rate, burst, concurrency):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = threading.Semaphore(concurrency)
+        self.breaker = CircuitBreaker()
+
+
+class FetchScheduler():
+    """Send requests to rate limited endpoints, retrying failures.
+
+    Each endpoint, such as the inspector URL, has a token bucket rate
+    limit, a cap on concurrent requests and a circuit breaker. Failed
+    requests are retried with jittered exponential backoff, and requests
+    to an endpoint whose circuit is open wait up to max_wait seconds for
+    it to close. The scheduler is shared by all fetch threads.
+
+    If set, observe is called with the endpoint name, the duration in
+    seconds and whether it succeeded after every request.
+    """
+
+    def __init__(self, rate=FETCH_RATE, burst=FETCH_BURST,
+                 concurrency=FETCH_CONCURRENCY, retries=FETCH_RETRIES,
+                 backoff_base=BACKOFF_BASE, backoff_max=BACKOFF_MAX,
+                 retryable=is_retryable, max_wait=BREAKER_MAX_WAIT):
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retryable = retryable
+        self.max_wait = max_wait
+        self.observe = None
+        self.endpoints = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, name):
+        with self._lock:
+            endpoint = self.endpoints.get(name)
+            if endpoint is None:
+                endpoint = self.endpoints[name] = Endpoint(
+                    self.rate, self.burst, self.concurrency)
+            return endpoint
+
+    def backoff(self, attempt):
+        """Return the seconds to wait before retry number attempt."""
+        # Full jitter spreads retries from many threads over the interval
+        return random.uniform(0, min(self.backoff_max,
+                                     self.backoff_base * 2 ** attempt))
+
+    def wait_for_circuit(self, name, endpoint):
+        """Wait while the circuit of an endpoint is open."""
+        waited = 0.0
+        while True:
+            wait = endpoint.breaker.check()
+            if not wait:
+                return
+            if waited >= self.max_wait:
+                raise CircuitOpenError("Requests to %s kept failing for %d "
+                                       "seconds" % (name, waited))
+            wait = min(wait, self.max_wait - waited)
+            LOG.debug("Circuit to %s is open, waiting %.1f seconds",
+                      name, wait)
+            time.sleep(wait)
+            waited += wait
+
+    def call(self, name, func, *args, **kwargs):
+        """Call func on the named endpoint and return its result."""
+        endpoint = self.endpoint(name)
+        attempt = 0
+        while True:
+            self.wait_for_circuit(name, endpoint)
+            endpoint.bucket.acquire()
+            try:
+                with endpoint.slots:
+                    start = time.time()
+                    result = func(*args, **kwargs)
+            except Exception as e:
+                self._observe(name, start, False)
+                if not self.retryable(e):
+                    # The endpoint answered, the request itself is bad
+                    endpoint.breaker.success()
+                    raise
+                endpoint.breaker.failure()
+                if attempt >= self.retries:
+                    raise
+                delay = self.backoff(attempt)
+                attempt += 1
+                LOG.debug("Request to %s failed with %s, retry %d in "
+                          "%.1f seconds", name, e, attempt, delay)
+                time.sleep(delay)
+            else:
+                self._observe(name, start, True)
+                endpoint.breaker.success()
+                return result
+
+    def _observe(self, name, start, success):
+        if self.observe is not None:
+            self.observe(name, time.time() - start, success)
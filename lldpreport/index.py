@@ -0,0 +1,281 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import mmap
+import os
+import struct
+from collections import defaultdict
+
+from lldpreport import snapshot
+
+# The lookup tables of an index are saved next to it as records of
+# (key, described interfaces), sorted by key. Each record is json and
+# is found by a binary search of the record offsets, so a lookup only
+# reads the records it compares against:
+#
+#   header        magic, record count
+#   offsets       record count + 1 offsets into the records
+#   records       the UTF-8 json records
+LOOKUP_MAGIC = b'LLDPIDX1'
+LOOKUP_HEADER = struct.Struct('<8sI')
+LOOKUP_OFFSET = struct.Struct('<Q')
+
+
+def default_index_path():
+    return os.environ.get('LLDPREPORT_INDEX') or os.path.join(
+        os.path.expanduser('~'), '.lldpreport', 'index.json')
+
+
+def normalize_mac(mac):
+    """Return a MAC address as lower case, colon separated hex."""
+    digits = ''.join(c for c in mac.lower() if c in '0123456789abcdef')
+    return ':'.join(digits[i:i + 2] for i in range(0, len(digits), 2))
+
+
+def lookup_path(path):
+    return path + '.lookup'
+
+
+def encode_lookups(tables):
+    """Return lookup tables, mapping key tuples to lists, as saved."""
+    records = [json.dumps([list(key), entries],
+                          sort_keys=True).encode('utf-8')
+               for key, entries in sorted(tables.items())]
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+    return b''.join([LOOKUP_HEADER.pack(LOOKUP_MAGIC, len(records))] +
+                    [LOOKUP_OFFSET.pack(offset) for offset in offsets] +
+                    records)
+
+
+class ReportIndex():
+    """Index of a saved LLDP report for lookups across nodes.
+
+    For each node the index keeps its name, a digest of its interface
+    bindings and the MAC address and switch port of each interface, and
+    maps MAC addresses, (switch, port) pairs and node names to them. A
+    refresh only re-indexes nodes whose digest changed. Saving also
+    writes the maps as lookup tables, which IndexLookups reads without
+    loading the index.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_index_path()
+        self.nodes = {}
+        self._macs = {}
+        self._ports = defaultdict(set)
+        self._names = {}
+
+    def load(self):
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as fp:
+                self.nodes = json.load(fp)['nodes']
+        for node_id in self.nodes:
+            self._add_entries(node_id)
+        return self
+
+    def save(self):
+        directory = os.path.dirname(self.path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        snapshot.write_file(self.path, json.dumps({'nodes': self.nodes},
+                                                  sort_keys=True))
+        snapshot.write_file(lookup_path(self.path),
+                            encode_lookups(self.lookup_tables()))
+
+    def _add_entries(self, node_id):
+        node = self.nodes[node_id]
+        if node.get('name'):
+            self._names[node['name']] = node_id
+        for intf_name, entry in node['interfaces'].items():
+            if entry.get('mac'):
+                self._macs[entry['mac']] = (node_id, intf_name)
+            if entry.get('port'):
+                for switch in entry['switches']:
+                    self._ports[(switch, entry['port'])].add(
+                        (node_id, intf_name))
+
+    def _remove_entries(self, node_id):
+        node = self.nodes[node_id]
+        if self._names.get(node.get('name')) == node_id:
+            del self._names[node['name']]
+        for intf_name, entry in node['interfaces'].items():
+            if self._macs.get(entry.get('mac')) == (node_id, intf_name):
+                del self._macs[entry['mac']]
+            for switch in entry['switches']:
+                key = (switch, entry.get('port'))
+                ports = self._ports.get(key)
+                if ports is not None:
+                    ports.discard((node_id, intf_name))
+                    if not ports:
+                        del self._ports[key]
+
+    def update_node(self, node_id, name, interfaces):
+        """Index the bindings of a node, returning whether they changed."""
+        digest = snapshot.bindings_digest([name, interfaces])
+        node = self.nodes.get(node_id)
+        if node is not None:
+            if node['digest'] == digest:
+                return False
+            self._remove_entries(node_id)
+
+        entries = {}
+        for intf_name, bindings in interfaces.items():
+            mac = bindings.get('interface_mac_address')
+            switches = [switch for switch in (
+                bindings.get('switch_system_name'),
+                bindings.get('switch_chassis_id')) if switch]
+            entries[intf_name] = {
+                'mac': normalize_mac(mac) if mac else None,
+                'switches': switches,
+                'port': bindings.get('switch_port_id'),
+            }
+
+        self.nodes[node_id] = {
+            'name': name,
+            'digest': digest,
+            'interfaces': entries,
+        }
+        self._add_entries(node_id)
+        return True
+
+    def remove_node(self, node_id):
+        if node_id in self.nodes:
+            self._remove_entries(node_id)
+            del self.nodes[node_id]
+
+    def by_mac(self, mac):
+        """Return the (node, interface) with a MAC address, or None."""
+        return self._macs.get(normalize_mac(mac))
+
+    def by_switch_port(self, switch, port):
+        """Return the (node, interface) pairs cabled to a switch port.
+
+        The switch is given by its system name or chassis ID.
+        """
+        return sorted(self._ports.get((switch, port), ()))
+
+    def node_uuid(self, name):
+        """Return the UUID of a node given its name, or None."""
+        return self._names.get(name)
+
+    def describe(self, node_id, intf_name):
+        """Return the indexed details of an interface."""
+        node = self.nodes[node_id]
+        entry = node['interfaces'][intf_name]
+        return {
+            'node': node_id,
+            'name': node.get('name'),
+            'interface': intf_name,
+            'mac': entry.get('mac'),
+            'switch': entry['switches'][0] if entry['switches'] else None,
+            'port': entry.get('port'),
+        }
+
+    def lookup_tables(self):
+        """Return the described interfaces for each lookup key."""
+        tables = {}
+        for mac, (node_id, intf_name) in self._macs.items():
+            tables[('mac', mac)] = [self.describe(node_id, intf_name)]
+        for (switch, port), pairs in self._ports.items():
+            tables[('port', switch, port)] = [
+                self.describe(node_id, intf_name)
+                for node_id, intf_name in sorted(pairs)]
+        for name, node_id in self._names.items():
+            tables[('name', name)] = [
+                self.describe(node_id, intf_name)
+                for intf_name in sorted(self.nodes[node_id]['interfaces'])]
+        return tables
+
+
+class IndexLookups():
+    """Look up interfaces in the lookup tables saved with an index.
+
+    The tables are memory mapped and binary searched, so a lookup reads
+    a few records rather than the whole index. Each lookup returns the
+    described interfaces, as given by ReportIndex.describe.
+    """
+
+    def __init__(self, path=None):
+        self.path = lookup_path(path or default_index_path())
+        self.map = None
+        self.count = 0
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, 'rb') as fp:
+            self.map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = LOOKUP_HEADER.unpack_from(self.map, 0)
+        if magic != LOOKUP_MAGIC:
+            self.map.close()
+            raise ValueError("%s is not an LLDP index" % self.path)
+        self.records = LOOKUP_HEADER.size + \
+            LOOKUP_OFFSET.size * (self.count + 1)
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _record(self, position):
+        start, end = struct.unpack_from(
+            '<QQ', self.map,
+            LOOKUP_HEADER.size + LOOKUP_OFFSET.size * position)
+        return json.loads(self.map[self.records + start:
+                                   self.records + end].decode('utf-8'))
+
+    def _find(self, key):
+        if None in key:
+            return []
+        key = list(key)
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            record_key, entries = self._record(middle)
+            if record_key == key:
+                return entries
+            if record_key < key:
+                low = middle + 1
+            else:
+                high = middle
+        return []
+
+    def by_mac(self, mac):
+        return self._find(('mac', normalize_mac(mac)))
+
+    def by_switch_port(self, switch, port):
+        """The switch is given by its system name or chassis ID."""
+        return self._find(('port', switch, port))
+
+    def by_node_name(self, name):
+        return self._find(('name', name))
+
+
+def open_lookups(path=None):
+    """Open the lookup tables of an index, writing them if missing.
+
+    An index saved without lookup tables is loaded once to write them.
+    """
+    path = path or default_index_path()
+    if os.path.exists(path) and not os.path.exists(lookup_path(path)):
+        ReportIndex(path).load().save()
+    return IndexLookups(path)
@@ -14,13 +14,23 @@
 # under the License.
 
 import binascii
+import copy
+import io
 import json
 import os
 import netaddr
+import struct
 import subprocess
 import sys
+import threading
+import time
 import logging
 from collections import defaultdict
+from collections import OrderedDict
+try:
+    import queue
+except ImportError:
+    import Queue as queue
 
 from cliff.command import Command
 from cliff.lister import Lister
@@ -29,10 +39,48 @@ import ironicclient.client as ironic_client
 import ironic_inspector_client
 from os_cloud_config.utils import clients
 
+from lldpreport import binreport
+from lldpreport import clouds
+from lldpreport import fetch
+from lldpreport import index
+from lldpreport import metrics
+from lldpreport import snapshot
+from lldpreport import watch
+
+LOG = logging.getLogger(__name__)
+
 test = False
 useCommand = False
 
+# Command writing the introspection data of a node to stdout, used instead
+# of the inspector API when useCommand is set
+INTROSPECTION_DATA_COMMAND = ['openstack', 'baremetal', 'introspection',
+                              'data', 'save']
+
+# Maximum number of distinct raw TLVs kept in the decode cache
+DECODE_CACHE_SIZE = 4096
+
+# Number of threads fetching introspection data for a fleet report
+FETCH_WORKERS = 8
+
+# Maximum number of fetched nodes waiting to be decoded
+DECODE_QUEUE_SIZE = 32
+
+# Ironic API version, 1.8 is the first to list only some node fields
+IRONIC_API_VERSION = '1.8'
+
+# Nodes per page of the node list, and the node fields it returns
+NODE_PAGE_SIZE = 100
+NODE_LIST_FIELDS = ['uuid', 'name']
+
+# Node fields listed by watch, which refetches nodes inspected again
+WATCH_NODE_FIELDS = ['uuid', 'name', 'inspection_finished_at']
+
+# Seconds between polls of watch
+WATCH_INTERVAL = 60
+
 # TLV types
+LLDP_TYPE_END = 0
 LLDP_TLV_TYPE_CHASSIS_ID = 1
 LLDP_TLV_TYPE_PORT_ID = 2
 LLDP_TYPE_TTL = 3
@@ -47,10 +95,10 @@ LLDP_TYPE_ORG_SPECIFIC = 127
 LLDP_802dot1_OUI = "0080c2"
 # subtypes
 dot1_PORT_VLANID = 1
-dot1_PORT_PROTOCOL_VLANID = 2  # TODO
+dot1_PORT_PROTOCOL_VLANID = 2
 dot1_VLAN_NAME = 3
 dot1_PROTOCOL_IDENTITY = 4
-dot1_VID_USAGE = 5  # TODO
+dot1_VID_USAGE = 5
 dot1_MANAGEMENT_VID = 6
 dot1_LINK_AGGREGATION = 7
 
@@ -58,26 +106,293 @@ dot1_LINK_AGGREGATION = 7
 LLDP_802dot3_OUI = "00120f"
 # subtypes
 dot3_MACPHY_CONFIG_STATUS = 1
-dot3_POWER_VIA_MDI = 2  # TODO
+dot3_POWER_VIA_MDI = 2
 dot3_LINK_AGGREGATION = 3  # DEPRECATED so not supported
 dot3_MTU = 4
 
+# LLDP-MED defines from ANSI/TIA-1057
+LLDP_MED_OUI = "0012bb"
+# subtypes
+MEDIA_ENDPOINT_CAPABILITIES = 1
+MED_NETWORK_POLICY = 2
+MED_LOCATION_ID = 3
+MED_EXTENDED_POWER_VIA_MDI = 4
+MED_HARDWARE_REVISION = 5
+MED_FIRMWARE_REVISION = 6
+MED_SOFTWARE_REVISION = 7
+MED_SERIAL_NUMBER = 8
+MED_MANUFACTURER_NAME = 9
+MED_MODEL_NAME = 10
+MED_ASSET_ID = 11
+
+# Address family numbers from IANA
+ADDRESS_FAMILY_IPV4 = 1
+ADDRESS_FAMILY_IPV6 = 2
+ADDRESS_FAMILY_802 = 6
+
 # Vendor specific
 JUNIPER_OUI = "009069"
 # subtype
 JUNIPER_CHASSIS_TYPE = 1
 
 
+def _build_bitmask_table(bit_names):
+    """Build a lookup table from a capability bitmask to its names.
+
+    bit_names is a sequence of (bit, name) pairs in output order. The
+    returned tuple is indexed by the bitmask (masked to the highest defined
+    bit) and holds a tuple of the names of every bit set in it.
+    """
+    size = 1 << max(bit for bit, name in bit_names).bit_length()
+    table = [()] * size
+    # Prepend names in reverse output order so that each entry is built
+    # from one already in the table
+    filled = [0]
+    for bit, name in reversed(bit_names):
+        for word in list(filled):
+            table[word | bit] = (name,) + table[word]
+            filled.append(word | bit)
+    # Undefined bits below the highest defined one are ignored
+    mask = sum(bit for bit, name in bit_names)
+    return tuple(table[word & mask] for word in range(size))
+
+
+def bitmask_names(table, word):
+    """Return the tuple of names for the bits set in word."""
+    return table[word & (len(table) - 1)]
+
+
+# System capabilities, from section 8.5.8 of IEEE Std 802.1AB-2009
+SYS_CAPABILITIES = _build_bitmask_table((
+    (0x0001, 'Other'),
+    (0x0002, 'Repeater'),
+    (0x0004, 'Bridge'),
+    (0x0008, 'WLAN'),
+    (0x0010, 'Router'),
+    (0x0020, 'Telephone'),
+    (0x0040, 'DOCSIS cable device'),
+    (0x0080, 'Station'),
+    (0x0100, 'C-Vlan'),
+    (0x0200, 'S-Vlan'),
+    (0x0400, 'TPMR'),
+))
+
+# PMD autonegotiation capability using BITS psuedotype encoding, see
+# section 8.1 of IEEE Std 802.1AB-2009, Interpretation Request #1 and
+# ifMauAutoNegCapAdvertisedBits in RFC 4836
+PMD_AUTONEG_CAPABILITIES = _build_bitmask_table((
+    (0x4000, '10BASE-T hdx'),
+    (0x2000, '10BASE-T fdx'),
+    (0x1000, '10BASE-T4'),
+    (0x0800, '100BASE-TX hdx'),
+    (0x0400, '100BASE-TX fdx'),
+    (0x0200, '100BASE-T2 hdx'),
+    (0x0100, '100BASE-T2 fdx'),
+    (0x0080, 'PAUSE fdx'),
+    (0x0040, 'Asymmetric PAUSE fdx'),
+    (0x0020, 'Symmetric PAUSE fdx'),
+    (0x0010, 'Asymmetric and Symmetric PAUSE fdx'),
+    (0x0008, '1000BASE-X hdx'),
+    (0x0004, '1000BASE-X fdx'),
+    (0x0002, '1000BASE-T hdx'),
+    (0x0001, '1000BASE-T fdx'),
+))
+
+# LLDP-MED capabilities, from section 10.2.2 of ANSI/TIA-1057
+MED_CAPABILITIES = _build_bitmask_table((
+    (0x0020, 'inventory'),
+    (0x0010, 'extended power via MDI-PD'),
+    (0x0008, 'extended power via MDI-PSE'),
+    (0x0004, 'location'),
+    (0x0002, 'network policy'),
+    (0x0001, 'LLDP_MED capabilities'),
+))
+
+# MDI power support, from section 79.3.2.1 of IEEE Std 802.3
+MDI_POWER_SUPPORT = _build_bitmask_table((
+    (0x01, 'PSE'),
+    (0x02, 'MDI power supported'),
+    (0x04, 'MDI power enabled'),
+    (0x08, 'pair control'),
+))
+
+MDI_POWER_PAIRS = {
+    1: "signal",
+    2: "spare",
+}
+
+MED_DEVICE_TYPES = {
+    0: "Not defined",
+    1: "Endpoint class I",
+    2: "Endpoint class II",
+    3: "Endpoint class III",
+    4: "Network connectivity",
+}
+
+# LLDP-MED network policy application types, from section 10.2.3.8 of
+# ANSI/TIA-1057
+MED_APPLICATION_TYPES = {
+    1: "voice",
+    2: "voice signaling",
+    3: "guest voice",
+    4: "guest voice signaling",
+    5: "softphone voice",
+    6: "video conferencing",
+    7: "streaming video",
+    8: "video signaling",
+}
+
+# LLDP-MED location data formats, only ELIN is a printable string
+MED_LOCATION_COORDINATE = 1
+MED_LOCATION_CIVIC = 2
+MED_LOCATION_ELIN = 3
+
+MED_LOCATION_FORMATS = {
+    MED_LOCATION_COORDINATE: "coordinate",
+    MED_LOCATION_CIVIC: "civic",
+    MED_LOCATION_ELIN: "ELIN",
+}
+
+MED_POWER_TYPES = {
+    0: "PSE",
+    1: "PD",
+}
+
+MED_PSE_POWER_SOURCES = {
+    0: "unknown",
+    1: "primary",
+    2: "backup",
+    3: "reserved",
+}
+
+MED_PD_POWER_SOURCES = {
+    0: "unknown",
+    1: "PSE",
+    2: "local",
+    3: "PSE and local",
+}
+
+# The power source bits mean different things for each power type
+MED_POWER_SOURCES = {
+    0: MED_PSE_POWER_SOURCES,
+    1: MED_PD_POWER_SOURCES,
+}
+
+MED_POWER_PRIORITIES = {
+    0: "unknown",
+    1: "critical",
+    2: "high",
+    3: "low",
+}
+
+# MAU types, from RFC 4836
+MAU_TYPES = {
+    0: "Unknown",
+    1: "AUI",
+    2: "10BASE - 5",
+    3: "FOIRL",
+    4: "10BASE - 2",
+    5: "10BASE - T duplex mode unknown",
+    6: "10BASE - FP",
+    7: "10BASE - FB",
+    8: "10BASE - FL duplex mode unknown",
+    9: "10BROAD36",
+    10: "10BASE - T half duplex",
+    11: "10BASE - T full duplex",
+    12: "10BASE - FL half duplex",
+    13: "10BASE - FL full duplex",
+    14: "100 BASE - T4",
+    15: "100BASE - TX half duplex",
+    16: "100BASE - TX full duplex",
+    17: "100BASE - FX half duplex",
+    18: "100BASE - FX full duplex",
+    19: "100BASE - T2 half duplex",
+    20: "100BASE - T2 full duplex",
+    21: "1000BASE - X half duplex",
+    22: "1000BASE - X full duplex",
+    23: "1000BASE - LX half duplex",
+    24: "1000BASE - LX full duplex",
+    25: "1000BASE - SX half duplex",
+    26: "1000BASE - SX full duplex",
+    27: "1000BASE - CX half duplex",
+    28: "1000BASE - CX full duplex",
+    29: "1000BASE - T half duplex",
+    30: "1000BASE - T full duplex",
+    31: "10GBASE - X",
+    32: "10GBASE - LX4",
+    33: "10GBASE - R",
+    34: "10GBASE - ER",
+    35: "10GBASE - LR",
+    36: "10GBASE - SR",
+    37: "10GBASE - W",
+    38: "10GBASE - EW",
+    39: "10GBASE - LW",
+    40: "10GBASE - SW",
+    41: "10GBASE - CX4",
+    42: "2BASE - TL",
+    43: "10PASS - TS",
+    44: "100BASE - BX10D",
+    45: "100BASE - BX10U",
+    46: "100BASE - LX10",
+    47: "1000BASE - BX10D",
+    48: "1000BASE - BX10U",
+    49: "1000BASE - LX10",
+    50: "1000BASE - PX10D",
+    51: "1000BASE - PX10U",
+    52: "1000BASE - PX20D",
+    53: "1000BASE - PX20U",
+}
+
+def decode_string(data):
+    """Decode a TLV string, replacing any invalid UTF-8."""
+    return data.decode('utf-8', 'replace')
+
+
+def decode_int(data):
+    """Decode a big-endian unsigned integer."""
+    return int(binascii.hexlify(data).decode(), 16)
+
+
+def decode_network_address(data):
+    """Decode an IANA address family number followed by an address."""
+    family = data[0]
+    if family == ADDRESS_FAMILY_IPV4:
+        return str(netaddr.IPAddress(decode_int(data[1:5]), 4))
+    elif family == ADDRESS_FAMILY_IPV6:
+        return str(netaddr.IPAddress(decode_int(data[1:17]), 6))
+    elif family == ADDRESS_FAMILY_802:
+        mac = netaddr.EUI(decode_int(data[1:7]))
+        mac.dialect = netaddr.mac_unix
+        return str(mac)
+    else:
+        return binascii.hexlify(data[1:]).decode()
+
+
 class TLV():
     """Base TLV class."""
 
+    # TLVs that can repeat on an interface are also collected in an
+    # instance of list_class
+    list_class = None
+
     def __init__(self):
         self.name = ""
         self.value = ""
         self.field = ""
 
     def output(self):
-        print("\t" + self.name + ": " + self.value)
+        print("\t%s: %s" % (self.name, self.value))
+
+
+class TLVList(TLV):
+    """Base class for the list of values of a repeated TLV."""
+
+    def __init__(self):
+        TLV.__init__(self)
+        self.value = []
+
+    def add(self, tlv):
+        self.value.append(tlv.value)
 
 
 class ChassisID_TLV(TLV):
@@ -99,9 +414,11 @@ class ChassisID_TLV(TLV):
             mac = netaddr.EUI(binascii.hexlify(data[1:]).decode())
             mac.dialect = netaddr.mac_unix
             self.value = str(mac)
+        elif data[0] == self.SUBTYPE_NETWORK_ADDRESS:
+            self.value = decode_network_address(data[1:])
         else:
             # treat all other types as strings
-            self.value = data[1:].decode()
+            self.value = decode_string(data[1:])
 
 
 class PortID_TLV(TLV):
@@ -123,11 +440,10 @@ class PortID_TLV(TLV):
             self.value = str(
                 netaddr.EUI(binascii.hexlify(data[1:]).decode()))
         elif data[0] == self.SUBTYPE_NETWORK_ADDRESS:
-            self.value = str(
-                netaddr.IPAddress(binascii.hexlify(data[1:]).decode()))
+            self.value = decode_network_address(data[1:])
         else:
             # treat all other types as strings
-            self.value = data[1:].decode()
+            self.value = decode_string(data[1:])
 
 class InterfaceMacAddress(TLV):
     """InterfaceMacAddress class"""
@@ -140,6 +456,17 @@ class InterfaceMacAddress(TLV):
         self.value = data
 
 
+class TTL_TLV(TLV):
+    """TTL_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Time To Live"
+        self.field = "switch_ttl"
+
+        self.value = "%d" % decode_int(data[0:2])
+
+
 class SysName_TLV(TLV):
     """SysName_TLV class"""
 
@@ -148,7 +475,7 @@ class SysName_TLV(TLV):
         self.name = "System Name"
         self.field = "switch_system_name"
 
-        self.value = data[0:].decode()
+        self.value = decode_string(data)
 
 
 class SysDesc_TLV(TLV):
@@ -159,7 +486,7 @@ class SysDesc_TLV(TLV):
         self.name = "System Description"
         self.field = "switch_system_description"
 
-        self.value = data[0:].decode()
+        self.value = decode_string(data)
 
 
 class SysCapabilities_TLV(TLV):
@@ -170,41 +497,20 @@ class SysCapabilities_TLV(TLV):
         self.name = "System Capabilities"
         self.field = "switch_system_capabilities"
 
-        sys_cap = []
-        b = data[1]
-        if b & 0x02:
-            sys_cap.append('Repeater')
-        if b & 0x04:
-            sys_cap.append('Bridge')
-        if b & 0x08:
-            sys_cap.append('WLAN')
-        if b & 0x10:
-            sys_cap.append('Router')
-        if b & 0x20:
-            sys_cap.append('Telephone')
-        if b & 0x40:
-            sys_cap.append('DOCSIS cable device')
-        if b & 0x80:
-            sys_cap.append('Station')
-        # TODO - look at this again...
-        if b & 0x100:
-            sys_cap.append('C-Vlan')
-        if b & 0x200:
-            sys_cap.append('S-Vlan')
-        if b & 0x400:
-            sys_cap.append('TPMR')
-
-        self.value = str(sys_cap)
+        sys_cap = (data[0] << 8) | data[1]
+        self.value = bitmask_names(SYS_CAPABILITIES, sys_cap)
 
 class MgmtAddress_TLV(TLV):
     """MgmtAddress_TLV class"""
 
     def __init__(self, data):
         TLV.__init__(self)
+        self.name = "Management Address"
+        self.field = "switch_management_address"
 
-        # TODO
-
-        self.value = data[0:].decode()
+        # Address string length includes the address family
+        address_length = data[0]
+        self.value = decode_network_address(data[1:1 + address_length])
 
 
 class PortDesc_TLV(TLV):
@@ -215,7 +521,7 @@ class PortDesc_TLV(TLV):
         self.name = "Port Description"
         self.field = "switch_port_description"
 
-        self.value = data[0:].decode()
+        self.value = decode_string(data)
 
 
 class VlanId_TLV(TLV):
@@ -226,8 +532,7 @@ class VlanId_TLV(TLV):
         self.name = "Port Untagged Vlan ID"
         self.field = "switch_port_untagged_vlan_id"
 
-        # TODO - can this be simplified?
-        self.value = "%d" % int(binascii.b2a_hex(data[0:2]).decode(), 16)
+        self.value = "%d" % decode_int(data[0:2])
 
 
 class VlanName_TLV(TLV):
@@ -238,27 +543,57 @@ class VlanName_TLV(TLV):
         self.name = "Port Vlan Name (ID)"
         self.field = "switch_port_vlan_name_and_id"
 
-        vlan_id = int(binascii.b2a_hex(data[0:2]).decode(), 16)
-        vlan_name = data[3:].decode()
+        self.vlan_id = decode_int(data[0:2])
+        vlan_name = decode_string(data[3:])
 
-        self.value = "%s (%d)" % (vlan_name, vlan_id)
+        self.value = "%s (%d)" % (vlan_name, self.vlan_id)
 
 
-class VlanNameList_TLV(TLV):
+class VlanNameList_TLV(TLVList):
     """VlanNameList_TLV class"""
 
-    def __init__(self, data):
-        TLV.__init__(self)
+    def __init__(self):
+        TLVList.__init__(self)
         self.name = "Port Vlans"
         self.field = "switch_port_vlans"
 
-        self.value = ""
-        self.vlan_list = []
 
-    def add_vlan(self, vlan):
-        self.vlan_list.append(vlan.value)
+VlanName_TLV.list_class = VlanNameList_TLV
+
+
+class PortProtocolVlanId_TLV(TLV):
+    """PortProtocolVlanId_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port and Protocol Vlan ID"
+        self.field = "switch_port_protocol_vlan_id"
+
+        # Flags are followed by the PPVID, which is 0 if not supported
+        self.value = "%d" % decode_int(data[1:3])
+
 
-        self.value = str(self.vlan_list)
+class PortProtocolVlanIdList_TLV(TLVList):
+    """PortProtocolVlanIdList_TLV class"""
+
+    def __init__(self):
+        TLVList.__init__(self)
+        self.name = "Port and Protocol Vlan IDs"
+        self.field = "switch_port_protocol_vlan_ids"
+
+
+PortProtocolVlanId_TLV.list_class = PortProtocolVlanIdList_TLV
+
+
+class VidUsageDigest_TLV(TLV):
+    """VidUsageDigest_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port VID Usage Digest"
+        self.field = "switch_port_vid_usage_digest"
+
+        self.value = binascii.hexlify(data[0:4]).decode()
 
 
 class ProtocolId_TLV(TLV):
@@ -269,7 +604,7 @@ class ProtocolId_TLV(TLV):
         self.name = "Protocol Identity"
         self.field = "switch_protocol_identify"
 
-        self.value = data[1:].decode()
+        self.value = decode_string(data[1:])
 
 
 class MgmtVlanId_TLV(TLV):
@@ -280,7 +615,7 @@ class MgmtVlanId_TLV(TLV):
         self.name = "Port Management Vlan ID"
         self.field = "switch_port_management_vlanid"
 
-        self.value = "%d" % int(binascii.b2a_hex(data[0:2]).decode(), 16)
+        self.value = "%d" % decode_int(data[0:2])
 
 
 class LinkAggregationConfig_TLV(TLV):
@@ -313,7 +648,7 @@ class LinkAggregationPortId_TLV(TLV):
         self.name = "Port Link Aggregation ID"
         self.field = "switch_port_link_aggregation_id"
 
-        port_id = int(binascii.b2a_hex(data[0:3]).decode(), 16)
+        port_id = decode_int(data[0:4])
 
         self.value = "%d" % port_id
 
@@ -348,42 +683,8 @@ class Pmd_Autoneg_Config_TLV(TLV):
         self.name = "Port Physical Media Capabilities"
         self.field = "switch_port_physical_capabilities"
 
-        # Get PMD autonegotiation capability using BITS
-        # psuedotype encoding, see section 8.1 of IEEE Std 802.1AB-2009
-        # and Interpretation Request #1
-        pmd_autoneg = []
-        if data[0] & 0x40:
-            pmd_autoneg.append('10BASE-T hdx')
-        if data[0] & 0x20:
-            pmd_autoneg.append('10BASE-T fdx')
-        if data[0] & 0x10:
-            pmd_autoneg.append('10BASE-T4')
-        if data[0] & 0x08:
-            pmd_autoneg.append('100Base-TX hdx')
-        if data[0] & 0x04:
-            pmd_autoneg.append('100BASE-TX fdx')
-        if data[0] & 0x02:
-            pmd_autoneg.append('100Base-T2 hdx')
-        if data[0] & 0x01:
-            pmd_autoneg.append('100BASE-T2 fdx')
-        if data[1] & 0x80:
-            pmd_autoneg.append('PAUSE fdx')
-        if data[1] & 0x40:
-            pmd_autoneg.append('Asymmetric PAUSE fdx')
-        if data[1] & 0x20:
-            pmd_autoneg.append('Symmetric PAUSE fdx')
-        if data[1] & 0x10:
-            pmd_autoneg.append('Asymmetric and Symmetric PAUSE fdx')
-        if data[1] & 0x08:
-            pmd_autoneg.append('1000Base-T hdx')
-        if data[1] & 0x04:
-            pmd_autoneg.append('1000BASE-T fdx')
-        if data[1] & 0x02:
-            pmd_autoneg.append('1000Base-T hdx')
-        if data[1] & 0x01:
-            pmd_autoneg.append('1000BASE-T fdx')
-
-        self.value = str(pmd_autoneg)
+        pmd_autoneg = (data[0] << 8) | data[1]
+        self.value = bitmask_names(PMD_AUTONEG_CAPABILITIES, pmd_autoneg)
 
 
 class Mau_Type_TLV(TLV):
@@ -394,65 +695,8 @@ class Mau_Type_TLV(TLV):
         self.name = "Port Media Attachment Unit Type"
         self.field = "switch_port_mau_type"
 
-        # MAU types, from RFC 4836
-        mau_types = {
-            0: "Unknown",
-            1: "AUI",
-            2: "10BASE - 5",
-            3: "FOIRL",
-            4: "10BASE - 2",
-            5: "10BASE - T duplex mode unknown",
-            6: "10BASE - FP",
-            7: "10BASE - FB",
-            8: "10BASE - FL duplex mode unknown",
-            9: "10BROAD36",
-            10: "10BASE - T half duplex",
-            11: "10BASE - T full duplex",
-            12: "10BASE - FL half duplex",
-            13: "10BASE - FL full duplex",
-            14: "100 BASE - T4",
-            15: "100BASE - TX half duplex",
-            16: "100BASE - TX full duplex",
-            17: "100BASE - FX half duplex",
-            18: "100BASE - FX full duplex",
-            19: "100BASE - T2 half duplex",
-            20: "100BASE - T2 full duplex",
-            21: "1000BASE - X half duplex",
-            22: "1000BASE - X full duplex",
-            23: "1000BASE - LX half duplex",
-            24: "1000BASE - LX full duplex",
-            25: "1000BASE - SX half duplex",
-            26: "1000BASE - SX full duplex",
-            27: "1000BASE - CX half duplex",
-            28: "1000BASE - CX full duplex",
-            29: "1000BASE - T half duplex",
-            30: "1000BASE - T full duplex",
-            31: "10GBASE - X",
-            32: "10GBASE - LX4",
-            33: "10GBASE - R",
-            34: "10GBASE - ER",
-            35: "10GBASE - LR",
-            36: "10GBASE - SR",
-            37: "10GBASE - W",
-            38: "10GBASE - EW",
-            39: "10GBASE - LW",
-            40: "10GBASE - SW",
-            41: "10GBASE - CX4",
-            42: "2BASE - TL",
-            43: "10PASS - TS",
-            44: "100BASE - BX10D",
-            45: "100BASE - BX10U",
-            46: "100BASE - LX10",
-            47: "1000BASE - BX10D",
-            48: "1000BASE - BX10U",
-            49: "1000BASE - LX10",
-            50: "1000BASE - PX10D",
-            51: "1000BASE - PX10U",
-            52: "1000BASE - PX20D",
-            53: "1000BASE - PX20U",
-        }
-
-        self.value = mau_types[data[0]]
+        mau_type = (data[0] << 8) | data[1]
+        self.value = MAU_TYPES.get(mau_type, "Unknown (%d)" % mau_type)
 
 
 class MTU_TLV(TLV):
@@ -463,8 +707,44 @@ class MTU_TLV(TLV):
         self.name = "Port MTU"
         self.field = "switch_port_mtu"
 
-        # TODO - can this be simplified?
-        self.value = "%d" % int(binascii.b2a_hex(data[0:2]).decode(), 16)
+        self.value = "%d" % decode_int(data[0:2])
+
+
+class MdiPowerSupport_TLV(TLV):
+    """MdiPowerSupport_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port MDI Power Support"
+        self.field = "switch_port_mdi_power_support"
+
+        self.value = bitmask_names(MDI_POWER_SUPPORT, data[0])
+
+
+class MdiPowerPair_TLV(TLV):
+    """MdiPowerPair_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port MDI Power Pair"
+        self.field = "switch_port_mdi_power_pair"
+
+        self.value = MDI_POWER_PAIRS.get(data[0], "Unknown (%d)" % data[0])
+
+
+class MdiPowerClass_TLV(TLV):
+    """MdiPowerClass_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port MDI Power Class"
+        self.field = "switch_port_mdi_power_class"
+
+        # Power classes 0-4 are encoded as 1-5, other values are invalid
+        if 1 <= data[0] <= 5:
+            self.value = "class %d" % (data[0] - 1)
+        else:
+            self.value = "Unknown (%d)" % data[0]
 
 
 class MED_Capabilities_TLV(TLV):
@@ -475,21 +755,8 @@ class MED_Capabilities_TLV(TLV):
             self.name = "Port MED Capabilities"
             self.field = "switch_port_med_capabilities"
 
-            med_capabilities = []
-            if data[1] & 0x20:
-                med_capabilities.append('inventory')
-            if data[1] & 0x10:
-                med_capabilities.append('extended power via MDI-PD')
-            if data[1] & 0x08:
-                med_capabilities.append('extended power via MDI-PSE')
-            if data[1] & 0x04:
-                med_capabilities.append('location')
-            if data[1] & 0x02:
-                med_capabilities.append('network policy')
-            if data[1] & 0x01:
-                med_capabilities.append('LLDP_MED capabilities')
-
-            self.value = str(med_capabilities)
+            med_capabilities = (data[0] << 8) | data[1]
+            self.value = bitmask_names(MED_CAPABILITIES, med_capabilities)
 
 
 class MED_Device_Type_TLV(TLV):
@@ -500,19 +767,144 @@ class MED_Device_Type_TLV(TLV):
         self.name = "Port MED Device Type"
         self.field = "switch_port_med_device_type"
 
-        device_type = ""
-        if data[0] == 0:
-            device_type = "Not defined"
-        elif data[0] == 1:
-            device_type = "Endpoint class I"
-        elif data[0] == 2:
-            device_type = "Endpoint class II"
-        elif data[0] == 3:
-            device_type = "Endpoint class III"
-        elif data[0] == 4:
-            device_type = "Network connectivity"
+        self.value = MED_DEVICE_TYPES.get(data[0], "Unknown (%d)" % data[0])
+
+
+class MED_Network_Policy_TLV(TLV):
+    """MED_Network_Policy_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port MED Network Policy"
+        self.field = "switch_port_med_network_policy"
+
+        app_type = MED_APPLICATION_TYPES.get(data[0],
+                                             "Unknown (%d)" % data[0])
+        # Unknown, tagged and reserved flags, 12 bit VLAN ID, 3 bit L2
+        # priority and 6 bit DSCP value
+        policy = decode_int(data[1:4])
+        if policy & 0x800000:
+            self.value = "%s: unknown" % app_type
+        else:
+            self.value = "%s: vlan %d%s, priority %d, dscp %d" % (
+                app_type, (policy >> 9) & 0xfff,
+                " tagged" if policy & 0x400000 else "",
+                (policy >> 6) & 0x07, policy & 0x3f)
+
+
+class MED_Network_Policy_List_TLV(TLVList):
+    """MED_Network_Policy_List_TLV class"""
+
+    def __init__(self):
+        TLVList.__init__(self)
+        self.name = "Port MED Network Policies"
+        self.field = "switch_port_med_network_policies"
+
+
+MED_Network_Policy_TLV.list_class = MED_Network_Policy_List_TLV
+
+
+class MED_Location_TLV(TLV):
+    """MED_Location_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port MED Location"
+        self.field = "switch_port_med_location"
+
+        location_format = MED_LOCATION_FORMATS.get(data[0],
+                                                   "Unknown (%d)" % data[0])
+        if data[0] == MED_LOCATION_ELIN:
+            location = decode_string(data[1:])
+        else:
+            location = binascii.hexlify(data[1:]).decode()
+
+        self.value = "%s: %s" % (location_format, location)
+
+
+class MED_Power_TLV(TLV):
+    """MED_Power_TLV class"""
+
+    def __init__(self, data):
+        TLV.__init__(self)
+        self.name = "Port MED Extended Power"
+        self.field = "switch_port_med_power"
+
+        # Power type, source and priority, followed by power in 0.1 W
+        power_type = data[0] >> 6
+        sources = MED_POWER_SOURCES.get(power_type, {})
+        self.value = "%s, %s source, %s priority, %.1f W" % (
+            MED_POWER_TYPES.get(power_type, "reserved"),
+            sources.get((data[0] >> 4) & 0x03, "reserved"),
+            MED_POWER_PRIORITIES.get(data[0] & 0x0f, "reserved"),
+            decode_int(data[1:3]) / 10.0)
+
+
+class MED_Inventory_TLV(TLV):
+    """Base class for the LLDP-MED inventory TLVs"""
+
+    def __init__(self, data, name, field):
+        TLV.__init__(self)
+        self.name = name
+        self.field = field
+
+        self.value = decode_string(data)
 
-        self.value = device_type
+
+class MED_Hardware_Revision_TLV(MED_Inventory_TLV):
+    """MED_Hardware_Revision_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Hardware Revision",
+                                   "switch_hardware_revision")
+
+
+class MED_Firmware_Revision_TLV(MED_Inventory_TLV):
+    """MED_Firmware_Revision_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Firmware Revision",
+                                   "switch_firmware_revision")
+
+
+class MED_Software_Revision_TLV(MED_Inventory_TLV):
+    """MED_Software_Revision_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Software Revision",
+                                   "switch_software_revision")
+
+
+class MED_Serial_Number_TLV(MED_Inventory_TLV):
+    """MED_Serial_Number_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Serial Number",
+                                   "switch_serial_number")
+
+
+class MED_Manufacturer_Name_TLV(MED_Inventory_TLV):
+    """MED_Manufacturer_Name_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Manufacturer Name",
+                                   "switch_manufacturer_name")
+
+
+class MED_Model_Name_TLV(MED_Inventory_TLV):
+    """MED_Model_Name_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Model Name",
+                                   "switch_model_name")
+
+
+class MED_Asset_Id_TLV(MED_Inventory_TLV):
+    """MED_Asset_Id_TLV class"""
+
+    def __init__(self, data):
+        MED_Inventory_TLV.__init__(self, data, "Switch Asset ID",
+                                   "switch_asset_id")
 
 
 class Juniper_chassis_TLV(TLV):
@@ -523,7 +915,434 @@ class Juniper_chassis_TLV(TLV):
             self.name = "VendorChassis Identifier"
             self.field = "switch_vendor_chassis_identifier"
 
-            self.value = "%s" % str(data[0:].decode())
+            self.value = decode_string(data)
+
+
+# Declarative decoder spec. Each entry maps a TLV type, or for
+# organizationally specific TLVs an (OUI, subtype) pair, to the TLV classes
+# decoded from it and the [start:end] slice of the TLV payload each is
+# given. Offsets of organizationally specific TLVs include the 3 byte OUI
+# and the subtype.
+TLV_SPEC = [
+    (LLDP_TYPE_END, ()),
+    (LLDP_TLV_TYPE_CHASSIS_ID, ((ChassisID_TLV, 0, None),)),
+    (LLDP_TLV_TYPE_PORT_ID, ((PortID_TLV, 0, None),)),
+    (LLDP_TYPE_TTL, ((TTL_TLV, 0, 2),)),
+    (LLDP_TYPE_PORT_DESCRIPTION, ((PortDesc_TLV, 0, None),)),
+    (LLDP_TYPE_SYS_NAME, ((SysName_TLV, 0, None),)),
+    (LLDP_TYPE_SYS_DESCRIPTION, ((SysDesc_TLV, 0, None),)),
+    (LLDP_TYPE_SYS_CAPABILITIES, ((SysCapabilities_TLV, 0, 4),)),
+    (LLDP_TYPE_MGMT_ADDRESS, ((MgmtAddress_TLV, 0, None),)),
+
+    ((LLDP_802dot1_OUI, dot1_PORT_VLANID), ((VlanId_TLV, 4, 6),)),
+    ((LLDP_802dot1_OUI, dot1_PORT_PROTOCOL_VLANID),
+     ((PortProtocolVlanId_TLV, 4, 7),)),
+    ((LLDP_802dot1_OUI, dot1_VLAN_NAME), ((VlanName_TLV, 4, None),)),
+    ((LLDP_802dot1_OUI, dot1_PROTOCOL_IDENTITY),
+     ((ProtocolId_TLV, 4, None),)),
+    ((LLDP_802dot1_OUI, dot1_VID_USAGE), ((VidUsageDigest_TLV, 4, 8),)),
+    ((LLDP_802dot1_OUI, dot1_MANAGEMENT_VID), ((MgmtVlanId_TLV, 4, 6),)),
+    ((LLDP_802dot1_OUI, dot1_LINK_AGGREGATION),
+     ((LinkAggregationConfig_TLV, 4, 5),
+      (LinkAggregationStatus_TLV, 4, 5),
+      (LinkAggregationPortId_TLV, 5, 9))),
+
+    ((LLDP_802dot3_OUI, dot3_MACPHY_CONFIG_STATUS),
+     ((Autoneg_Config_TLV, 4, 5),
+      (Autoneg_Status_TLV, 4, 5),
+      (Pmd_Autoneg_Config_TLV, 5, 7),
+      (Mau_Type_TLV, 7, 9))),
+    ((LLDP_802dot3_OUI, dot3_POWER_VIA_MDI),
+     ((MdiPowerSupport_TLV, 4, 5),
+      (MdiPowerPair_TLV, 5, 6),
+      (MdiPowerClass_TLV, 6, 7))),
+    # TLV has been deprecated, but still in use
+    ((LLDP_802dot3_OUI, dot3_LINK_AGGREGATION),
+     ((LinkAggregationConfig_TLV, 4, 5),
+      (LinkAggregationStatus_TLV, 4, 5),
+      (LinkAggregationPortId_TLV, 5, 9))),
+    ((LLDP_802dot3_OUI, dot3_MTU), ((MTU_TLV, 4, 6),)),
+
+    ((LLDP_MED_OUI, MEDIA_ENDPOINT_CAPABILITIES),
+     ((MED_Capabilities_TLV, 4, 6),
+      (MED_Device_Type_TLV, 6, 7))),
+    ((LLDP_MED_OUI, MED_NETWORK_POLICY),
+     ((MED_Network_Policy_TLV, 4, 8),)),
+    ((LLDP_MED_OUI, MED_LOCATION_ID), ((MED_Location_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_EXTENDED_POWER_VIA_MDI), ((MED_Power_TLV, 4, 7),)),
+    ((LLDP_MED_OUI, MED_HARDWARE_REVISION),
+     ((MED_Hardware_Revision_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_FIRMWARE_REVISION),
+     ((MED_Firmware_Revision_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_SOFTWARE_REVISION),
+     ((MED_Software_Revision_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_SERIAL_NUMBER), ((MED_Serial_Number_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_MANUFACTURER_NAME),
+     ((MED_Manufacturer_Name_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_MODEL_NAME), ((MED_Model_Name_TLV, 4, None),)),
+    ((LLDP_MED_OUI, MED_ASSET_ID), ((MED_Asset_Id_TLV, 4, None),)),
+
+    ((JUNIPER_OUI, JUNIPER_CHASSIS_TYPE), ((Juniper_chassis_TLV, 4, None),)),
+]
+
+
+def _build_decoder_table(spec):
+    """Build the decoder lookup table from the declarative spec.
+
+    Organizationally specific TLVs are keyed by the raw bytes of their OUI
+    and subtype so that decoding needs a single dictionary lookup.
+    """
+    table = {}
+    for key, decoders in spec:
+        if isinstance(key, tuple):
+            oui, subtype = key
+            key = bytes(bytearray(binascii.unhexlify(oui)) +
+                        bytearray([subtype]))
+        table[key] = decoders
+    return table
+
+
+def _min_length(decoders):
+    # The length a TLV needs for every fixed-width slice to be complete
+    return max([start if end is None else end
+                for tlv_class, start, end in decoders] or [0])
+
+
+TLV_DECODERS = _build_decoder_table(
+    (key, (_min_length(decoders), tuple(decoders)))
+    for key, decoders in TLV_SPEC)
+
+
+def decode_tlv(tlv_type, data):
+    """Decode the raw bytes of an LLDP TLV into a list of TLV objects.
+
+    Returns None if the TLV type or subtype is not supported, and raises
+    ValueError if the TLV is too short for its fields.
+    """
+    if tlv_type == LLDP_TYPE_ORG_SPECIFIC:
+        entry = TLV_DECODERS.get(bytes(data[0:4]))
+    else:
+        entry = TLV_DECODERS.get(tlv_type)
+
+    if entry is None:
+        return None
+
+    min_length, decoders = entry
+    if len(data) < min_length:
+        raise ValueError("TLV is %d bytes, expected at least %d" %
+                         (len(data), min_length))
+
+    return [tlv_class(data[start:end]) for tlv_class, start, end in decoders]
+
+
+def tlv_key(tlv_type, data):
+    """Return a printable key identifying the kind of a raw TLV."""
+    if tlv_type == LLDP_TYPE_ORG_SPECIFIC and len(data) >= 4:
+        return "%d/%s/%d" % (tlv_type, binascii.hexlify(data[0:3]).decode(),
+                             data[3])
+    return "%d" % tlv_type
+
+
+class DecodeCache():
+    """LRU cache of decoded TLV objects keyed by TLV type and raw bytes.
+
+    Most TLVs are byte-identical on every interface cabled to the same
+    switch, so they only need to be decoded once per report, and every
+    interface shares the decoded objects and their values. Unsupported
+    TLVs are cached as None; TLVs that fail to decode are not cached.
+    The cache is shared by the decoding threads of every region.
+    """
+
+    def __init__(self, maxsize=DECODE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.decode_time = 0.0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def decode(self, tlv_type, data):
+        key = (tlv_type, bytes(data))
+        with self._lock:
+            if key in self._entries:
+                obj_list = self._entries.pop(key)
+                self._entries[key] = obj_list
+                self.hits += 1
+                return obj_list
+            self.misses += 1
+
+        start = time.time()
+        obj_list = decode_tlv(tlv_type, data)
+        if obj_list is not None:
+            obj_list = tuple(obj_list)
+
+        with self._lock:
+            self.decode_time += time.time() - start
+            if key not in self._entries and \
+                    len(self._entries) >= self.maxsize:
+                self._entries.popitem(last=False)
+            self._entries[key] = obj_list
+        return obj_list
+
+    def stats(self):
+        return {
+            'decode_cache_hits': self.hits,
+            'decode_cache_misses': self.misses,
+            'decode_cache_size': len(self._entries),
+            'decode_time': self.decode_time,
+        }
+
+
+decode_cache = DecodeCache()
+
+
+class DecodeErrors():
+    """Decode errors and unknown TLV counts collected during a report.
+
+    Errors are recorded per node and interface instead of aborting the
+    report, so that one malformed TLV does not take down a fleet run.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.error_count = 0
+        self.unknown_count = 0
+
+    def _interface(self, node_id, interface):
+        node = self.nodes.setdefault(node_id, {'errors': [],
+                                               'interfaces': {}})
+        return node['interfaces'].setdefault(interface, {
+            'errors': [],
+            'unknown_tlvs': defaultdict(int),
+        })
+
+    def add_node_error(self, node_id, message):
+        node = self.nodes.setdefault(node_id, {'errors': [],
+                                               'interfaces': {}})
+        node['errors'].append(message)
+        self.error_count += 1
+
+    def add_error(self, node_id, interface, tlv_type, message):
+        self._interface(node_id, interface)['errors'].append(
+            {'tlv_type': tlv_type, 'error': message})
+        self.error_count += 1
+
+    def add_unknown(self, node_id, interface, key):
+        self._interface(node_id, interface)['unknown_tlvs'][key] += 1
+        self.unknown_count += 1
+
+    def merge(self, other, region=None):
+        """Add the errors collected by another DecodeErrors.
+
+        If region is given the nodes are keyed as region/UUID.
+        """
+        for node_id, other_node in other.nodes.items():
+            if region is not None:
+                node_id = "%s/%s" % (region, node_id)
+            node = self.nodes.setdefault(node_id, {'errors': [],
+                                                   'interfaces': {}})
+            node['errors'].extend(other_node['errors'])
+            for interface, other_intf in other_node['interfaces'].items():
+                intf = self._interface(node_id, interface)
+                intf['errors'].extend(other_intf['errors'])
+                for key, count in other_intf['unknown_tlvs'].items():
+                    intf['unknown_tlvs'][key] += count
+        self.error_count += other.error_count
+        self.unknown_count += other.unknown_count
+
+    def as_dict(self):
+        """Return the errors in a json serializable format."""
+        return {
+            'decode_errors': self.error_count,
+            'unknown_tlvs': self.unknown_count,
+            'nodes': self.nodes,
+        }
+
+    def log_summary(self):
+        if self.error_count or self.unknown_count:
+            LOG.warning("%d decode errors and %d unknown TLVs on %d nodes",
+                        self.error_count, self.unknown_count,
+                        len(self.nodes))
+
+
+def _interface_name(errors, node_id, info):
+    # Inventory interfaces without a name cannot be reported
+    name = info.get('name') if isinstance(info, dict) else None
+    if name is None and errors is not None:
+        errors.add_node_error(node_id, "Inventory interface without a name")
+    return name
+
+
+def _iter_lldp_pairs(errors, node_id, nic, info):
+    # Yield the (TLV type, hex value) pairs of an inventory interface
+    for tlv_entry in info.get('lldp') or []:
+        try:
+            tlv_type, tlv_value = tlv_entry
+        except (TypeError, ValueError):
+            if errors is not None:
+                errors.add_error(node_id, nic, None,
+                                 "LLDP entry is not a (type, value) pair: "
+                                 "%r" % (tlv_entry,))
+            continue
+        yield tlv_type, tlv_value
+
+
+def _int_column(column):
+    return ["%d" % value for value in column]
+
+
+def _flag_column(mask):
+    return lambda column: [str((value & mask) != 0) for value in column]
+
+
+def _table_column(table):
+    return lambda column: [bitmask_names(table, value) for value in column]
+
+
+def _mau_column(column):
+    return [MAU_TYPES.get(value, "Unknown (%d)" % value) for value in column]
+
+
+# Fixed-width TLVs that can be decoded in bulk. Each entry gives the
+# (OUI, subtype) pair, the struct format of the payload following the
+# subtype and the columns produced from it as (field, struct item,
+# conversion). Values are converted to the strings the TLV classes give.
+BULK_TLV_SPEC = [
+    ((LLDP_802dot1_OUI, dot1_PORT_VLANID), '>H',
+     (('switch_port_untagged_vlan_id', 0, _int_column),)),
+    ((LLDP_802dot1_OUI, dot1_MANAGEMENT_VID), '>H',
+     (('switch_port_management_vlanid', 0, _int_column),)),
+    ((LLDP_802dot1_OUI, dot1_LINK_AGGREGATION), '>BI',
+     (('switch_port_link_aggregation_support', 0, _flag_column(0x01)),
+      ('switch_port_link_aggregation_enabled', 0, _flag_column(0x02)),
+      ('switch_port_link_aggregation_id', 1, _int_column))),
+    ((LLDP_802dot3_OUI, dot3_LINK_AGGREGATION), '>BI',
+     (('switch_port_link_aggregation_support', 0, _flag_column(0x01)),
+      ('switch_port_link_aggregation_enabled', 0, _flag_column(0x02)),
+      ('switch_port_link_aggregation_id', 1, _int_column))),
+    ((LLDP_802dot3_OUI, dot3_MACPHY_CONFIG_STATUS), '>BHH',
+     (('switch_port_autonegotiation_support', 0, _flag_column(0x01)),
+      ('switch_port_autonegotiation_enabled', 0, _flag_column(0x02)),
+      ('switch_port_physical_capabilities', 1,
+       _table_column(PMD_AUTONEG_CAPABILITIES)),
+      ('switch_port_mau_type', 2, _mau_column))),
+    ((LLDP_802dot3_OUI, dot3_MTU), '>H',
+     (('switch_port_mtu', 0, _int_column),)),
+]
+
+BULK_DECODERS = _build_decoder_table(
+    (key, (struct.Struct(fmt), columns))
+    for key, fmt, columns in BULK_TLV_SPEC)
+
+BULK_FIELDS = frozenset(field for key, fmt, columns in BULK_TLV_SPEC
+                        for field, item, convert in columns)
+
+
+def _iter_unpack(unpacker, packed):
+    # Struct.iter_unpack is not available before Python 3.4
+    if hasattr(unpacker, 'iter_unpack'):
+        return unpacker.iter_unpack(packed)
+    return (unpacker.unpack_from(packed, offset)
+            for offset in range(0, len(packed), unpacker.size))
+
+
+class FieldColumn():
+    """Values of one field for many interfaces, in columnar form.
+
+    rows holds the (node, interface) of each value and is shared between
+    the columns decoded from the same TLV.
+    """
+
+    def __init__(self, field, rows, values):
+        self.field = field
+        self.rows = rows
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def items(self):
+        return zip(self.rows, self.values)
+
+    def group(self):
+        """Return the rows for each distinct value."""
+        groups = defaultdict(list)
+        for row, value in zip(self.rows, self.values):
+            groups[value].append(row)
+        return groups
+
+
+class BulkDecoder():
+    """Decode fixed-width TLVs for many interfaces at once.
+
+    Raw TLVs are grouped by OUI and subtype and their payloads packed into
+    one byte array per group, which is then unpacked in a single pass into
+    a FieldColumn per field.
+    """
+
+    def __init__(self, errors=None):
+        self.errors = errors
+        self._rows = defaultdict(list)
+        self._packed = defaultdict(bytearray)
+
+    def add_interfaces(self, node_id, interface_data, int_name=None):
+        for info in interface_data:
+            nic = _interface_name(self.errors, node_id, info)
+            if nic is None:
+                continue
+            if (int_name is not None) and (int_name != nic):
+                continue
+
+            for tlv_type, tlv_value in _iter_lldp_pairs(self.errors, node_id,
+                                                        nic, info):
+                if tlv_type != LLDP_TYPE_ORG_SPECIFIC:
+                    continue
+
+                try:
+                    data = binascii.unhexlify(tlv_value)
+                except (TypeError, ValueError):
+                    if self.errors is not None:
+                        self.errors.add_error(
+                            node_id, nic, tlv_type,
+                            "TLV value not in correct format, TLV value "
+                            "must be in hexadecimal")
+                    continue
+
+                key = data[0:4]
+                decoder = BULK_DECODERS.get(key)
+                if decoder is None:
+                    continue
+
+                size = decoder[0].size
+                if len(data) < 4 + size:
+                    if self.errors is not None:
+                        self.errors.add_error(node_id, nic, tlv_type,
+                                              "TLV value too short")
+                    continue
+
+                self._rows[key].append((node_id, nic))
+                self._packed[key] += data[4:4 + size]
+
+    def decode(self):
+        """Return a FieldColumn for each field, keyed by field name."""
+        columns = {}
+        for key, packed in self._packed.items():
+            unpacker, spec = BULK_DECODERS[key]
+            rows = self._rows[key]
+            items = list(zip(*_iter_unpack(unpacker, bytes(packed))))
+            for field, item, convert in spec:
+                values = convert(items[item])
+
+                column = columns.get(field)
+                if column is None:
+                    columns[field] = FieldColumn(field, rows, values)
+                else:
+                    # 802.1 and deprecated 802.3 link aggregation TLVs
+                    # share their fields
+                    column.rows = column.rows + rows
+                    column.values = column.values + values
+        return columns
+
 
 def env(*args, **kwargs):
     """Returns the first environment variable set.
@@ -537,219 +1356,192 @@ def env(*args, **kwargs):
     return kwargs.get('default', '')
 
 
+class IntrospectionDataError(Exception):
+    """Raised when the introspection data of a node cannot be read."""
+
+
 class LldpReporter():
 
+    def __init__(self, os_config=None, region=None):
+        self.os_config = os_config
+        self.region = region
+        self.errors = DecodeErrors()
+        self.scheduler = fetch.FetchScheduler()
+        self.inspector = None
+        self.node_fields = None
+        self.node_names = {}
+        self.inspected = {}
+        self.failed_nodes = set()
+
     def get_ironic_lldp_data(self, node_id, keystone_client):
         # Return list of interface data in json format
         if test:
             filename = "./interfaces-node-1.json"
             with open(filename, 'r') as f:
-                contents = f.read()
-                return contents
+                return json.load(f)
 
         elif useCommand:
-            filename = "tmp"
-            cmd = "/bin/openstack baremetal introspection data save " + \
-                  node_id + " > " + filename
-            print("Running cmd " + cmd)
-
-            try:
-                p = subprocess.Popen(cmd, shell=True,
-                                     stdout=subprocess.PIPE,
-                                     stderr=subprocess.PIPE)
-
-            except OSError as e:
-                print("Error running introspection data save, Error: %s" % e)
-                exit()
-
-            stdout, stderr = p.communicate()
-            if p.returncode != 0:
-                print(('Error running introspection data save.'
-                       'Stdout: "%(stdout)s". Stderr: %(stderr)s') %
-                      {'stdout': stdout, 'stderr': stderr})
-
-            with open(filename, 'r') as f:
-                contents = f.read()
-                return contents
+            # Limit the number of commands run at once like API requests
+            return self.scheduler.call(INTROSPECTION_DATA_COMMAND[0],
+                                       self.get_command_lldp_data, node_id)
 
         else:
-            inspector_url = keystone_client.service_catalog.url_for(
-                service_type="baremetal-introspection",
-                endpoint_type="publicURL")
-
-            client = ironic_inspector_client.ClientV1(
-                session=keystone_client.session,
-                inspector_url=inspector_url)
-
-            introspected_data = client.get_data(node_id)
-            # data = json.dump(introspected_data, sys.stdout)
+            if self.inspector is None:
+                # Each region of a cloud has its own inspector endpoint
+                os_config = self.get_os_config(None)
+                inspector_url = keystone_client.service_catalog.url_for(
+                    service_type="baremetal-introspection",
+                    endpoint_type="publicURL",
+                    region_name=os_config.get('os_region_name'))
+
+                client = ironic_inspector_client.ClientV1(
+                    session=keystone_client.session,
+                    inspector_url=inspector_url)
+                self.inspector = (inspector_url, client)
+
+            # Rate limited and retried, as inspector returns 503s and
+            # times out when many nodes are fetched at once
+            inspector_url, client = self.inspector
+            introspected_data = self.scheduler.call(
+                inspector_url, client.get_data, node_id)
             return introspected_data
 
+    def get_command_lldp_data(self, node_id):
+        # Parse the data written to stdout, every node has its own process
+        # and pipes so that many can run at once
+        cmd = INTROSPECTION_DATA_COMMAND + [node_id]
+        LOG.debug("Running cmd %s", " ".join(cmd))
+
+        try:
+            p = subprocess.Popen(cmd, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE)
+        except OSError as e:
+            raise IntrospectionDataError(
+                "Error running introspection data save, Error: %s" % e)
+
+        # Drain stderr while stdout is parsed so neither pipe fills up
+        stderr = []
+        reader = threading.Thread(target=lambda: stderr.append(
+            p.stderr.read()))
+        reader.daemon = True
+        reader.start()
+
+        try:
+            introspected_data = json.load(
+                io.TextIOWrapper(p.stdout, encoding='utf-8'))
+        except ValueError as e:
+            introspected_data = None
+            parse_error = e
+        finally:
+            p.stdout.close()
+            p.wait()
+            reader.join()
+
+        if p.returncode != 0:
+            raise IntrospectionDataError(
+                'Error running introspection data save. Stderr: %s' %
+                b''.join(stderr).decode('utf-8', 'replace').strip())
+        if introspected_data is None:
+            raise IntrospectionDataError(
+                'Invalid introspection data: %s' % parse_error)
+
+        return introspected_data
+
     def get_lldp_interface_data(self, interface_data, node_id, int_name = None):
         interfaces = {}
         # List of dictionaries is returned, each lldp entry is
         # list of lists
         found = False
         for info in interface_data:
-            if (int_name is not None) and (int_name != info['name']):
+            nic = _interface_name(self.errors, node_id, info)
+            if nic is None:
+                continue
+            if (int_name is not None) and (int_name != nic):
                 continue
 
             found = True
             obj_list = []
-            vlan_name_list = None
-            nic = info["name"]
+            tlv_lists = {}
 
             # Get mac_address which is in interface, not in lldp
-            mac = info["mac_address"]
+            mac = info.get("mac_address")
             tlv = InterfaceMacAddress(mac)
             obj_list.append(tlv)
 
-            tlv_entry = info["lldp"]
-            for tlv_type, tlv_value in tlv_entry:
+            for tlv_type, tlv_value in _iter_lldp_pairs(self.errors, node_id,
+                                                        nic, info):
 
                 try:
                     data = bytearray(binascii.unhexlify(tlv_value))
-                except TypeError:
-                    LOG.warning(_LW("TLV value for TLV type %d not in correct"
-                                "format, TLV value must be in hexidecimal"),
-                                tlv_type)
+                except (TypeError, ValueError):
+                    self.errors.add_error(
+                        node_id, nic, tlv_type,
+                        "TLV value not in correct format, TLV value must be "
+                        "in hexadecimal")
                     continue
 
-                if tlv_type == LLDP_TLV_TYPE_CHASSIS_ID:
-                    tlv = ChassisID_TLV(data)
-                    obj_list.append(tlv)
-
-                elif tlv_type == LLDP_TLV_TYPE_PORT_ID:
-                    tlv = PortID_TLV(data)
-                    obj_list.append(tlv)
-
-                elif tlv_type == LLDP_TYPE_PORT_DESCRIPTION:
-                    tlv = PortDesc_TLV(data)
-                    obj_list.append(tlv)
-
-                elif tlv_type == LLDP_TYPE_SYS_NAME:
-                    tlv = SysName_TLV(data)
-                    obj_list.append(tlv)
-
-                elif tlv_type == LLDP_TYPE_SYS_DESCRIPTION:
-                    tlv = SysDesc_TLV(data)
-                    obj_list.append(tlv)
+                try:
+                    decoded = decode_cache.decode(tlv_type, data)
+                except Exception as e:
+                    self.errors.add_error(node_id, nic, tlv_type,
+                                          "%s: %s" % (type(e).__name__, e))
+                    continue
 
-                elif tlv_type == LLDP_TYPE_SYS_CAPABILITIES:
-                    tlv = SysCapabilities_TLV(data)
-                    obj_list.append(tlv)
+                if decoded is None:
+                    self.errors.add_unknown(node_id, nic,
+                                            tlv_key(tlv_type, data))
+                    continue
 
-                elif tlv_type == LLDP_TYPE_MGMT_ADDRESS:
-                    tlv = MgmtAddress_TLV(data)
+                for tlv in decoded:
                     obj_list.append(tlv)
-
-                elif tlv_type == LLDP_TYPE_ORG_SPECIFIC:
-                    oui = str((binascii.hexlify(data[0:3]).decode()))
-                    subtype = data[3]
-                    if oui == LLDP_802dot1_OUI:
-                        if subtype == dot1_PORT_VLANID:
-                            tlv = VlanId_TLV(data[4:])
-                            obj_list.append(tlv)
-                        elif subtype == dot1_VLAN_NAME:
-                            vlan = VlanName_TLV(data[4:])
-                            obj_list.append(vlan)
-                            if vlan_name_list is None:
-                                vlan_name_list = VlanNameList_TLV(data[4:])
-                                obj_list.append(vlan_name_list)
-                            vlan_name_list.add_vlan(vlan)
-                        elif subtype == dot1_PROTOCOL_IDENTITY:
-                            tlv = ProtocolId_TLV(data[4:])
-                            obj_list.append(tlv)
-                        elif subtype == dot1_MANAGEMENT_VID:
-                            tlv = MgmtVlanId_TLV(data[4:])
-                            obj_list.append(tlv)
-                        elif subtype == dot1_LINK_AGGREGATION:
-                            tlv = LinkAggregationConfig_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = LinkAggregationStatus_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = LinkAggregationPortId_TLV(data[5:])
-                            obj_list.append(tlv)
-                        else:
-                            print("Unexpected 802.1 subtype detected %d" %
-                                  subtype)
-
-                    elif oui == LLDP_802dot3_OUI:
-                        if subtype == dot3_MACPHY_CONFIG_STATUS:
-                            tlv = Autoneg_Config_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = Autoneg_Status_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = Pmd_Autoneg_Config_TLV(data[5:])
-                            obj_list.append(tlv)
-                            tlv = Mau_Type_TLV(data[7:8])
-                            obj_list.append(tlv)
-                        elif subtype == dot3_MTU:
-                            tlv = MTU_TLV(data[4:])
-                            obj_list.append(tlv)
-                        elif subtype == dot3_LINK_AGGREGATION:
-                            # TLV has been deprecated, but still in use
-                            tlv = LinkAggregationConfig_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = LinkAggregationStatus_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = LinkAggregationPortId_TLV(data[5:])
-                            obj_list.append(tlv)
-                        else:
-                            print("Unexpected 802.3 subtype detected %d"
-                                  % subtype)
-
-                    elif oui == LLDP_MED_OUI:
-                        if subtype == MEDIA_ENDPOINT_CAPABILITIES:
-                            tlv = MED_Capabilities_TLV(data[4:])
-                            obj_list.append(tlv)
-                            tlv = MED_Device_Type_TLV(data[6:])
-                            obj_list.append(tlv)
-                        else:
-                            print("Unexpected LLDP_MED subtype detected %d"
-                                  % subtype)
-
-                    elif oui == JUNIPER_OUI:
-                        if subtype == JUNIPER_CHASSIS_TYPE:
-                            tlv = Juniper_chassis_TLV(data[4:])
-                            obj_list.append(tlv)
-                        else:
-                            print("Unexpected Juniper subtype detected %d"
-                                  % subtype)
+                    if tlv.list_class is not None:
+                        tlv_list = tlv_lists.get(tlv.list_class)
+                        if tlv_list is None:
+                            tlv_list = tlv_lists[tlv.list_class] = \
+                                tlv.list_class()
+                            obj_list.append(tlv_list)
+                        tlv_list.add(tlv)
 
             interfaces[nic] = obj_list
 
         if not found:
-            print("Could not find interface " + int_name + " for node " + node_id)
+            if int_name is not None:
+                self.errors.add_node_error(
+                    node_id, "Could not find interface %s" % int_name)
             return None
 
         return interfaces
 
 
-    def get_lldp_report(self, keystone_client, uuid, int_name = None):
+    def get_inventory_interfaces(self, keystone_client, uuid):
 
         json_data = self.get_ironic_lldp_data(uuid, keystone_client)
 
-        # json data is list of dictionaries, lldp data is list of lists
-        interfaces = json_data['inventory']['interfaces']
-
-        return self.get_lldp_interface_data(interfaces, uuid, int_name)
-
-    def get_interfaces_per_node(self, keystone_client, uuid):
+        return self.extract_interfaces(uuid, json_data)
 
-        json_data = self.get_ironic_lldp_data(uuid, keystone_client)
+    def extract_interfaces(self, uuid, json_data):
 
         # json data is list of dictionaries, lldp data is list of lists
-        all_interfaces = json_data['inventory']['interfaces']
+        try:
+            return json_data['inventory']['interfaces']
+        except (KeyError, TypeError):
+            self.errors.add_node_error(
+                uuid, "No interface inventory in introspection data")
+            return []
 
-        intf_list = []
-        for info in all_interfaces:
-            intf_list.append(info['name'])
+    def get_lldp_report(self, keystone_client, uuid, int_name = None):
 
-        return intf_list
+        interfaces = self.get_inventory_interfaces(keystone_client, uuid)
+        if not interfaces:
+            return {}
+
+        return self.get_lldp_interface_data(interfaces, uuid, int_name)
 
     def get_os_config(self, argv):
 
+        if self.os_config is not None:
+            return self.os_config
+
         os_username = env('OS_USERNAME')
         os_password = env('OS_PASSWORD')
         os_auth_url = env('OS_AUTH_URL')
@@ -764,76 +1556,575 @@ class LldpReporter():
 
         return kwargs
 
-    def get_interface_report(self, argv):
-
-        # Prevent log info messages for HTTP requests
-        logging.getLogger("requests").setLevel(logging.WARNING)
+    def get_clients(self, argv):
 
         os_config = self.get_os_config(argv)
 
-        ironic = ironic_client.get_client(1, **os_config)
+        ironic = ironic_client.get_client(
+            1, os_ironic_api_version=IRONIC_API_VERSION, **os_config)
 
         keystone_client = clients.get_keystone_client(os_config['os_username'],
                                                       os_config['os_password'],
                                                       os_config['os_tenant_name'],
                                                       os_config['os_auth_url'])
 
+        return ironic, keystone_client
+
+    def get_interface_report(self, argv):
+
+        # Prevent log info messages for HTTP requests
+        logging.getLogger("requests").setLevel(logging.WARNING)
+
+        ironic, keystone_client = self.get_clients(argv)
+
         interface_report = self.get_lldp_report(keystone_client, argv.node, argv.interface)
+        self.errors.log_summary()
 
         return interface_report
 
     def get_interface_lists(self, argv):
+        """Return the names of the inventory interfaces of each node.
 
-        # Prevent log info messages for HTTP requests
-        logging.getLogger("requests").setLevel(logging.WARNING)
+        Nodes are fetched by the pipeline, so nodes that could not be
+        fetched are left out and recorded in failed_nodes.
+        """
 
-        os_config = self.get_os_config(argv)
+        interfaces = {}
+        for node_key, interface_data in self.iter_raw_report(argv):
+            intf_list = []
+            for info in interface_data:
+                nic = _interface_name(self.errors, node_key, info)
+                if nic is not None:
+                    intf_list.append(nic)
+            interfaces[node_key] = intf_list
+        self.errors.log_summary()
 
-        ironic = ironic_client.get_client(1, **os_config)
+        return interfaces
 
-        keystone_client = clients.get_keystone_client(os_config['os_username'],
-                                                      os_config['os_password'],
-                                                      os_config['os_tenant_name'],
-                                                      os_config['os_auth_url'])
-        interfaces = {}
-        for node in ironic.node.list():
-            if argv.node is not None and argv.node != node.uuid:
+    def get_full_report(self, argv):
+
+        return dict(self.iter_full_report(argv))
+
+    def node_key(self, node_uuid):
+        """Return the key of a node in reports, region/UUID in a region."""
+        if self.region is None:
+            return node_uuid
+        return "%s/%s" % (self.region, node_uuid)
+
+    def iter_nodes(self, ironic):
+        """Yield the nodes of ironic as each page of the list arrives.
+
+        Ironic caps pages at its api.max_limit, which may be below
+        NODE_PAGE_SIZE, so only an empty page ends the list.
+        """
+        fields = self.node_fields or NODE_LIST_FIELDS
+        marker = None
+        while True:
+            page = ironic.node.list(marker=marker, limit=NODE_PAGE_SIZE,
+                                    fields=fields)
+            if not page:
+                return
+            for node in page:
+                yield node
+            marker = page[-1].uuid
+
+    def iter_node_ids(self, ironic, argv, node_filter=None):
+        """Yield the UUIDs of the nodes to report on, recording names."""
+        for node in self.iter_nodes(ironic):
+            key = self.node_key(node.uuid)
+            if argv.node is not None and argv.node not in (node.uuid, key):
                 continue
+            self.node_names[key] = getattr(node, 'name', None)
+            self.inspected[key] = getattr(node, 'inspection_finished_at',
+                                          None)
+            if node_filter is None or key in node_filter:
+                yield node.uuid
+
+    def node_missing(self, node_key):
+        """Return whether a node was not in the last node list."""
+        return node_key not in self.inspected
+
+    def fetch_failed(self, node_uuid, error):
+        """Record a node whose introspection data could not be fetched."""
+        self.errors.add_node_error(
+            node_uuid, "Failed to fetch introspection data: %s: %s"
+            % (type(error).__name__, error))
+        self.failed_nodes.add(self.node_key(node_uuid))
+
+    def iter_full_report(self, argv, node_filter=None):
+        """Yield (node key, decoded interfaces) as each node is decoded.
+
+        node_filter optionally limits the report to a set of node keys.
+        Nodes that could not be fetched are left out and recorded in
+        failed_nodes, so they are not mistaken for nodes without LLDP
+        data.
+        """
 
-            # Get report for all interfaces on this node
-            intf_per_node = self.get_interfaces_per_node(keystone_client, node.uuid)
+        logging.getLogger("requests").setLevel(logging.WARNING)
 
-            interfaces[node.uuid] = intf_per_node
+        ironic, keystone_client = self.get_clients(argv)
 
-        return interfaces
+        # Nodes are fetched while later pages of the node list load
+        node_ids = self.iter_node_ids(ironic, argv, node_filter)
+        pipeline = DecodePipeline(self, keystone_client)
+        for node_uuid, node_report in pipeline.decode(node_ids,
+                                                      argv.interface):
+            yield self.node_key(node_uuid), node_report
 
-    def get_full_report(self, argv):
+        self.errors.log_summary()
+
+    def aggregate(self, argv, aggregators, node_filter=None):
+        """Feed each decoded interface once to every aggregator."""
+
+        for node_uuid, node_report in self.iter_full_report(argv,
+                                                            node_filter):
+            for aggregator in aggregators:
+                aggregator.add_node(node_uuid)
+            if not node_report:
+                continue
+            for intf_name, obj_list in node_report.items():
+                for aggregator in aggregators:
+                    aggregator.add_interface(node_uuid, intf_name, obj_list)
+
+        return [aggregator.result() for aggregator in aggregators]
+
+    def iter_raw_report(self, argv, node_filter=None):
+        """Yield (node key, undecoded inventory interfaces) as fetched.
+
+        Nodes are fetched by the same pipeline as iter_full_report, and
+        nodes that could not be fetched are left out the same way.
+        """
 
         logging.getLogger("requests").setLevel(logging.WARNING)
 
-        os_config = self.get_os_config(argv)
+        ironic, keystone_client = self.get_clients(argv)
 
-        ironic = ironic_client.get_client(1, **os_config)
+        node_ids = self.iter_node_ids(ironic, argv, node_filter)
+        pipeline = DecodePipeline(self, keystone_client)
+        for node_uuid, json_data in pipeline.fetch(node_ids):
+            yield (self.node_key(node_uuid),
+                   self.extract_interfaces(node_uuid, json_data))
+
+    def get_raw_report(self, argv):
+        """Return the undecoded inventory interfaces of each node."""
+
+        return dict(self.iter_raw_report(argv))
+
+    def bulk_decode(self, argv):
+        """Return a FieldColumn of each fixed-width field of every node."""
+
+        decoder = BulkDecoder(self.errors)
+        for node_key, interface_data in self.iter_raw_report(argv):
+            decoder.add_interfaces(node_key, interface_data, argv.interface)
+        self.errors.log_summary()
+
+        return decoder.decode()
 
-        keystone_client = clients.get_keystone_client(os_config['os_username'],
-                                                      os_config['os_password'],
-                                                      os_config['os_tenant_name'],
-                                                      os_config['os_auth_url'])
 
-        full_report = {}
-        for node in ironic.node.list():
-            if argv.node is not None and argv.node != node.uuid:
+class FederatedReporter(LldpReporter):
+    """Report on several clouds at once, keying nodes by region/UUID.
+
+    Each region has its own reporter, with its own clients, fetch
+    scheduler and decode pipeline, and the regions are fetched
+    concurrently, so a report takes as long as the slowest region.
+    """
+
+    def __init__(self, regions):
+        super(FederatedReporter, self).__init__()
+        self.reporters = OrderedDict()
+        for region, os_config in regions:
+            reporter = LldpReporter(os_config, region)
+            reporter.node_names = self.node_names
+            reporter.inspected = self.inspected
+            reporter.failed_nodes = self.failed_nodes
+            self.reporters[region] = reporter
+        self.failed_regions = set()
+
+    def _region_argvs(self, argv):
+        # A region/UUID node only needs its own region to be asked
+        region, sep, node_uuid = (argv.node or '').partition('/')
+        if sep and region in self.reporters:
+            region_argv = copy.copy(argv)
+            region_argv.node = node_uuid
+            return [(self.reporters[region], region_argv)]
+        return [(reporter, argv) for reporter in self.reporters.values()]
+
+    def _region_failed(self, reporter, error):
+        # One unreachable region does not stop the others
+        self.failed_regions.add(reporter.region)
+        LOG.error("Failed to report on region %s: %s",
+                  reporter.region, error)
+        self.errors.add_node_error(
+            reporter.region, "Failed to report on region: %s: %s"
+            % (type(error).__name__, error))
+
+    def get_interface_report(self, argv):
+        region_argvs = self._region_argvs(argv)
+        if len(region_argvs) != 1:
+            raise ValueError("Node %s must be given as region/UUID, with a "
+                             "region from --os-cloud" % argv.node)
+        reporter, region_argv = region_argvs[0]
+        interface_report = reporter.get_interface_report(region_argv)
+        self.errors.merge(reporter.errors, reporter.region)
+        return interface_report
+
+    def _run_region(self, reporter, method, argv, node_filter, results):
+        reporter.node_fields = self.node_fields
+        reporter.scheduler.observe = self.scheduler.observe
+        error = None
+        try:
+            for item in method(reporter, argv, node_filter):
+                results.put((reporter, item, None))
+        except Exception as e:
+            error = e
+        finally:
+            results.put((reporter, None, error))
+
+    def node_missing(self, node_key):
+        # Nodes of a region that could not be listed are not missing
+        region = node_key.partition('/')[0]
+        return (region not in self.failed_regions and
+                node_key not in self.inspected)
+
+    def _iter_regions(self, argv, method, node_filter):
+        # Run a per-node generator on every region at once
+        self.failed_regions = set()
+        results = queue.Queue(maxsize=DECODE_QUEUE_SIZE)
+        region_argvs = self._region_argvs(argv)
+        for reporter, region_argv in region_argvs:
+            runner = threading.Thread(target=self._run_region,
+                                      args=(reporter, method, region_argv,
+                                            node_filter, results))
+            runner.daemon = True
+            runner.start()
+
+        running = len(region_argvs)
+        while running:
+            reporter, item, error = results.get()
+            if item is not None:
+                yield item
                 continue
 
-            if argv.interface is not None:
-                node_report = self.get_lldp_report(keystone_client, node.uuid, argv.interface)
-            else:
-                # Get report for all interfaces on this node
-                node_report = self.get_lldp_report(keystone_client, node.uuid)
+            running -= 1
+            self.errors.merge(reporter.errors, reporter.region)
+            if error is not None:
+                self._region_failed(reporter, error)
+
+    def iter_full_report(self, argv, node_filter=None):
+        return self._iter_regions(argv, LldpReporter.iter_full_report,
+                                  node_filter)
+
+    def iter_raw_report(self, argv, node_filter=None):
+        return self._iter_regions(argv, LldpReporter.iter_raw_report,
+                                  node_filter)
+
+
+def new_reporter(app):
+    """Return a reporter for the clouds chosen with --os-cloud.
+
+    Without --os-cloud the OS_* environment variables are used.
+    """
+    names = getattr(getattr(app, 'options', None), 'os_clouds', None)
+    if not names:
+        return LldpReporter()
+
+    cloud_profiles = clouds.load_clouds()
+    regions = [(name, clouds.os_config(cloud_profiles, name))
+               for name in names]
+    if len(regions) == 1:
+        return LldpReporter(regions[0][1])
+    return FederatedReporter(regions)
+
+
+class DecodePipeline():
+    """Fetch and decode introspection data for many nodes concurrently.
+
+    Fetch threads put the raw introspection data of each node on a
+    bounded queue, which is decoded in the calling thread as it arrives.
+    With the decode cache warm, decoding a node costs far less than
+    fetching it, and decoding in one process keeps the cache and the
+    decoded objects shared across the whole report. Fetching blocks
+    while the queue is full, so at most DECODE_QUEUE_SIZE fetched nodes
+    are held in memory waiting to be decoded.
+    """
+
+    def __init__(self, reporter, keystone_client, fetch_workers=FETCH_WORKERS,
+                 queue_size=DECODE_QUEUE_SIZE):
+        self.reporter = reporter
+        self.keystone_client = keystone_client
+        self.fetch_workers = fetch_workers
+        self.queue_size = queue_size
+
+    def _list(self, node_ids, pending):
+        # Hand nodes to the fetchers as they are listed
+        try:
+            for node_id in node_ids:
+                pending.put(node_id)
+        except Exception as e:
+            self.list_error = e
+        finally:
+            for i in range(self.fetch_workers):
+                pending.put(None)
+
+    def _fetch(self, node_ids, payloads):
+        # Fetch nodes until none are left, then tell the consumer
+        try:
+            while True:
+                node_id = node_ids.get()
+                if node_id is None:
+                    break
+                try:
+                    json_data = self.reporter.get_ironic_lldp_data(
+                        node_id, self.keystone_client)
+                except Exception as e:
+                    payloads.put((node_id, None, e))
+                    continue
+                payloads.put((node_id, json_data, None))
+        finally:
+            payloads.put(None)
+
+    def run(self, node_ids, int_name=None):
+        return dict(self.decode(node_ids, int_name))
+
+    def fetch(self, node_ids):
+        """Yield (node UUID, introspection data) as nodes are fetched.
+
+        node_ids may be a generator, such as a paged node list, which is
+        read on its own thread while the nodes are fetched. Nodes that
+        could not be fetched are recorded with the reporter and skipped.
+        """
+        pending = queue.Queue()
+        self.list_error = None
+        lister = threading.Thread(target=self._list,
+                                  args=(node_ids, pending))
+        lister.daemon = True
+        lister.start()
+        payloads = queue.Queue(maxsize=self.queue_size)
+
+        running = 0
+        for i in range(self.fetch_workers):
+            fetcher = threading.Thread(target=self._fetch,
+                                       args=(pending, payloads))
+            fetcher.daemon = True
+            fetcher.start()
+            running += 1
+
+        while running:
+            item = payloads.get()
+            if item is None:
+                running -= 1
+                continue
+
+            node_id, json_data, error = item
+            if error is not None:
+                # Retries are exhausted, report the rest of the fleet
+                self.reporter.fetch_failed(node_id, error)
+                continue
+
+            yield node_id, json_data
+
+        if self.list_error is not None:
+            raise self.list_error
+
+    def decode(self, node_ids, int_name=None):
+        """Yield (node UUID, decoded interfaces) as nodes are fetched."""
+        for node_id, json_data in self.fetch(node_ids):
+            interfaces = self.reporter.extract_interfaces(node_id, json_data)
+            if not interfaces:
+                yield node_id, {}
+                continue
+
+            yield node_id, self.reporter.get_lldp_interface_data(
+                interfaces, node_id, int_name)
+
+
+class Aggregator():
+    """Base class for consumers of the decoded interfaces of a report."""
+
+    def add_node(self, node_id):
+        pass
+
+    def add_interface(self, node_id, intf_name, obj_list):
+        pass
+
+    def result(self):
+        return None
+
+
+class VlanAggregator(Aggregator):
+    """Collect the nodes and interfaces on which each VLAN is configured."""
+
+    def __init__(self):
+        self.vlans = defaultdict(lambda: defaultdict(list))
+
+    def add_interface(self, node_id, intf_name, obj_list):
+        for obj in obj_list:
+            if isinstance(obj, VlanName_TLV):
+                self.vlans[obj.value][node_id].append(intf_name)
+
+    def result(self):
+        vlans = {}
+        for vlan_name, port_dict in self.vlans.items():
+            vlans[vlan_name] = dict(
+                (node_id, sorted(intf_list))
+                for node_id, intf_list in port_dict.items())
+        return vlans
+
+
+class FieldAggregator(Aggregator):
+    """Collect the value of one field on each interface."""
+
+    def __init__(self, field):
+        self.field = field
+        self.values = []
+
+    def add_interface(self, node_id, intf_name, obj_list):
+        for obj in obj_list:
+            if obj.field == self.field:
+                interface = "%s:%s" % (node_id, intf_name)
+                self.values.append((interface, obj.value))
 
-            full_report[node.uuid] = node_report
+    def result(self):
+        return sorted(self.values)
 
-        return full_report
+
+class BindingsAggregator(Aggregator):
+    """Collect the field/value bindings of each interface."""
+
+    def __init__(self):
+        self.report = {}
+
+    def add_node(self, node_id):
+        self.report.setdefault(node_id, {})
+
+    def add_interface(self, node_id, intf_name, obj_list):
+        bindings = {}
+        for obj in obj_list:
+            bindings[obj.field] = obj.value
+        self.report[node_id][intf_name] = bindings
+
+    def result(self):
+        return self.report
+
+
+class TopologyAggregator(Aggregator):
+    """Collect the interfaces cabled to each switch port."""
+
+    def __init__(self):
+        self.switches = defaultdict(lambda: defaultdict(list))
+
+    def add_interface(self, node_id, intf_name, obj_list):
+        switch = None
+        chassis = None
+        port = None
+        for obj in obj_list:
+            if isinstance(obj, SysName_TLV):
+                switch = obj.value
+            elif isinstance(obj, ChassisID_TLV):
+                chassis = obj.value
+            elif isinstance(obj, PortID_TLV):
+                port = obj.value
+
+        switch = switch or chassis
+        if switch is not None and port is not None:
+            interface = "%s:%s" % (node_id, intf_name)
+            self.switches[switch][port].append(interface)
+
+    def result(self):
+        topology = {}
+        for switch, port_dict in self.switches.items():
+            topology[switch] = dict(
+                (port, sorted(intf_list))
+                for port, intf_list in port_dict.items())
+        return topology
+
+
+class ValidateAggregator(Aggregator):
+    """Compare each interface against its expected network config.
+
+    expected maps node UUID to interface name to a dict with any of
+    "vlans" (list of VLAN IDs), "native_vlan", "mtu" and "lag" (true or
+    false for whether link aggregation is enabled, or the aggregated port
+    ID). Only the keys given are checked.
+
+    failed_nodes is the set of nodes that could not be fetched, usually
+    the reporter's, whose interfaces are reported as fetch_failed rather
+    than missing.
+    """
+
+    def __init__(self, expected, failed_nodes=()):
+        self.expected = {}
+        for node_id, intf_dict in expected.items():
+            for intf_name, config in intf_dict.items():
+                self.expected[(node_id, intf_name)] = config
+        self.failed_nodes = failed_nodes
+        self.seen = set()
+        self.mismatches = []
+
+    def _mismatch(self, node_id, intf_name, check, expected, actual):
+        self.mismatches.append({
+            'node': node_id,
+            'interface': intf_name,
+            'check': check,
+            'expected': expected,
+            'actual': actual,
+        })
+
+    def add_interface(self, node_id, intf_name, obj_list):
+        config = self.expected.get((node_id, intf_name))
+        if config is None:
+            return
+        self.seen.add((node_id, intf_name))
+
+        vlans = set()
+        actual = {}
+        for obj in obj_list:
+            if isinstance(obj, VlanName_TLV):
+                vlans.add(obj.vlan_id)
+            elif isinstance(obj, VlanId_TLV):
+                actual['native_vlan'] = int(obj.value)
+            elif isinstance(obj, MTU_TLV):
+                actual['mtu'] = int(obj.value)
+            elif isinstance(obj, LinkAggregationStatus_TLV):
+                actual['lag_enabled'] = obj.value == "True"
+            elif isinstance(obj, LinkAggregationPortId_TLV):
+                actual['lag_id'] = int(obj.value)
+
+        if 'vlans' in config:
+            expected_vlans = set(int(vlan) for vlan in config['vlans'])
+            if expected_vlans != vlans:
+                self._mismatch(node_id, intf_name, 'vlans',
+                               sorted(expected_vlans), sorted(vlans))
+
+        for check in ('native_vlan', 'mtu'):
+            if check in config and \
+                    int(config[check]) != actual.get(check):
+                self._mismatch(node_id, intf_name, check,
+                               int(config[check]), actual.get(check))
+
+        if 'lag' in config:
+            lag = config['lag']
+            # A port without a link aggregation TLV is not aggregated
+            enabled = actual.get('lag_enabled', False)
+            if isinstance(lag, bool):
+                if lag != enabled:
+                    self._mismatch(node_id, intf_name, 'lag', lag, enabled)
+            else:
+                lag_id = actual.get('lag_id') if enabled else None
+                if int(lag) != lag_id:
+                    self._mismatch(node_id, intf_name, 'lag', int(lag),
+                                   lag_id)
+
+    def result(self):
+        for node_id, intf_name in sorted(set(self.expected) - self.seen):
+            if node_id in self.failed_nodes:
+                self._mismatch(node_id, intf_name, 'fetch_failed',
+                               'fetched', None)
+            else:
+                self._mismatch(node_id, intf_name, 'interface', 'present',
+                               None)
+        return sorted(self.mismatches,
+                      key=lambda m: (m['node'], m['interface'], m['check']))
 
 
 class InterfaceList(Lister):
@@ -846,7 +2137,7 @@ class InterfaceList(Lister):
         return parser
 
     def take_action(self, parsed_args):
-        report = LldpReporter().get_interface_lists(parsed_args)
+        report = new_reporter(self.app).get_interface_lists(parsed_args)
 
         return (("Node", "Interfaces"),
                  list((node_name, sorted(intf_list)) for node_name, intf_list in report.items()))
@@ -861,11 +2152,18 @@ class InterfaceShow(ShowOne):
                             help="name or UUID of the node")
         parser.add_argument("interface", metavar="<interface>",
                             help="interface name")
+        parser.add_argument("--from-file", metavar="<filename>",
+                            default=None,
+                            help="read a report written by 'save' instead "
+                                 "of fetching one")
         return parser
 
     def take_action(self, parsed_args):
+        if parsed_args.from_file:
+            return self.take_file_action(parsed_args)
+
         # Get list of classes
-        report = LldpReporter().get_interface_report(parsed_args)
+        report = new_reporter(self.app).get_interface_report(parsed_args)
 
         fields = []
         values = []
@@ -877,49 +2175,71 @@ class InterfaceShow(ShowOne):
             for int_name, obj_list in sorted(report.items()):
                 # dict has been filtered for "interface" TODO - add check
                 for obj in obj_list:
-                    if isinstance(obj, VlanName_TLV):
-                        continue # show vlans in VlanNameList, not individually
+                    if obj.list_class is not None:
+                        continue # show repeated TLVs in their list, not individually
                     fields.append(obj.field)
                     values.append(obj.value)
 
         return (fields, values)
 
+    def take_file_action(self, parsed_args):
+        # Only the requested interface is read from a binary report
+        with binreport.open_report(parsed_args.from_file) as report:
+            interfaces = report.node(parsed_args.node, parsed_args.interface)
+
+        fields = ["node", "interface"]
+        values = [parsed_args.node, parsed_args.interface]
+        for field, value in sorted((interfaces or {}).get(
+                parsed_args.interface, {}).items()):
+            fields.append(field)
+            values.append(value)
+
+        return (fields, values)
+
 
 class VlanList(Lister):
     "show each VLAN and the interfaces where it is configured"
 
     def get_parser(self, prog_name):
-        parser = super(VlanShow, self).get_parser(prog_name)
+        parser = super(VlanList, self).get_parser(prog_name)
         parser.add_argument("--node", metavar="<node>",
                             help="name or UUID of the node")
         parser.add_argument("--interface", metavar="<interface>",
                             help="interface name")
+        parser.add_argument("--untagged", action="store_true",
+                            help="list the untagged VLAN ID of each port "
+                                 "instead of the VLAN names")
         # TODO - take optional vlan name?
         return parser
 
     def take_action(self, parsed_args):
-        report = LldpReporter().get_full_report(parsed_args)
+        if parsed_args.untagged:
+            return self.take_untagged_action(parsed_args)
 
         # Get list of interfaces mapped to vlan and node
-        vlans = {}
-        if report is not None:
-            vlan_dict = defaultdict(lambda: defaultdict(list))
-            for node_name, intf_dict in sorted(report.items()):
-                for intf_name, obj_list in sorted(intf_dict.items()):
-                    for obj in obj_list:
-                        if isinstance(obj, VlanName_TLV):
-                            vlan_dict[obj.value][node_name].append(intf_name)
-
-            # Reformat interface list suitable for printing
-            for vlan_name, port_dict in sorted(vlan_dict.items()):
-                interfaces = {}
-                for node_name, intf_list in sorted(port_dict.items()):
-                    interfaces[node_name] = intf_list
-                vlans[vlan_name] = interfaces
+        vlans, = new_reporter(self.app).aggregate(parsed_args, [VlanAggregator()])
 
         return (("Switch Vlan", "Switch Port Connections"),
                  list((vlan_name, intf_list) for vlan_name, intf_list in sorted(vlans.items())))
 
+    def take_untagged_action(self, parsed_args):
+        # The untagged VLAN ID is fixed-width, so decode it in bulk
+        column = new_reporter(self.app).bulk_decode(parsed_args).get(
+            'switch_port_untagged_vlan_id')
+
+        vlans = []
+        if column is not None:
+            for vlan_id, rows in column.group().items():
+                port_dict = defaultdict(list)
+                for node_id, intf_name in rows:
+                    port_dict[node_id].append(intf_name)
+                vlans.append((vlan_id, dict(
+                    (node_id, sorted(intf_list))
+                    for node_id, intf_list in port_dict.items())))
+
+        return (("Switch Vlan ID", "Switch Port Connections"),
+                sorted(vlans, key=lambda vlan: int(vlan[0])))
+
 
 class Save(Command):
     "save or display the full LLDP report for all nodes in json format"
@@ -932,28 +2252,38 @@ class Save(Command):
                             help="interface name")
         parser.add_argument("--file", metavar="<filename>", default=None,
                             help="write output to file")
+        parser.add_argument("--format", choices=["json", "binary"],
+                            default="json",
+                            help="output format, binary reports are "
+                                 "indexed by node for 'interface show' and "
+                                 "'field show --from-file'")
+        parser.add_argument("--errors-file", metavar="<filename>",
+                            default=None,
+                            help="write decode errors and unknown TLV "
+                                 "counts to file")
         return parser
 
     def take_action(self, parsed_args):
-        report = LldpReporter().get_full_report(parsed_args)
+        reporter = new_reporter(self.app)
+        formatted_report, = reporter.aggregate(parsed_args,
+                                               [BindingsAggregator()])
 
-        formatted_report = {}
-        for node_uuid, intf_dict in sorted(report.items()):
-            intfs = {}
-            for intf_name, obj_list in sorted(intf_dict.items()):
-                bindings = {}
-                for obj in obj_list:
-                    bindings[obj.field] = obj.value
-                intfs[intf_name] = bindings
-
-            formatted_report[node_uuid] = intfs
-
-        if parsed_args.file:
-            with open(parsed_args.file, 'wb') as fp:
+        if parsed_args.format == "binary":
+            if parsed_args.file:
+                binreport.write_report(parsed_args.file, formatted_report)
+            else:
+                stdout = getattr(sys.stdout, 'buffer', sys.stdout)
+                stdout.write(binreport.encode_report(formatted_report))
+        elif parsed_args.file:
+            with open(parsed_args.file, 'w') as fp:
                 json.dump(formatted_report, fp, sort_keys=True)
         else:
             json.dump(formatted_report, sys.stdout, sort_keys=True)
 
+        if parsed_args.errors_file:
+            with open(parsed_args.errors_file, 'w') as fp:
+                json.dump(reporter.errors.as_dict(), fp, sort_keys=True)
+
 
 class FieldShow(Lister):
     "show the value of provided field for each node/interfaces"
@@ -964,21 +2294,454 @@ class FieldShow(Lister):
                             help="name of a field shown in the 'interface show' command")
         parser.add_argument("--node", metavar="<node>",
                             help="name or UUID of the node")
-        parser.add_argument("--iface", metavar="<iface>",
+        parser.add_argument("--iface", metavar="<iface>", dest="interface",
                             help="interface name")
+        parser.add_argument("--from-file", metavar="<filename>",
+                            default=None,
+                            help="read a report written by 'save' instead "
+                                 "of fetching one")
         return parser
 
     def take_action(self, parsed_args):
-        report = LldpReporter().get_full_report(parsed_args)
+        if parsed_args.from_file:
+            return self.take_file_action(parsed_args)
+        if parsed_args.field in BULK_FIELDS:
+            return self.take_bulk_action(parsed_args)
 
         # Get value that matches input field
+        values, = new_reporter(self.app).aggregate(
+            parsed_args, [FieldAggregator(parsed_args.field)])
+
+        return (("Node:Interface", parsed_args.field), values)
+
+    def take_bulk_action(self, parsed_args):
+        # Fixed-width fields are decoded for all interfaces at once
+        column = new_reporter(self.app).bulk_decode(parsed_args).get(
+            parsed_args.field)
         values = []
-        if report is not None:
-            for node_name, intf_dict in sorted(report.items()):
-                for intf_name, obj_list in sorted(intf_dict.items()):
-                    for obj in obj_list:
-                        if obj.field == parsed_args.field:
-                            interface = "%s:%s" % (node_name, intf_name)
-                            values.append((interface, obj.value))
+        if column is not None:
+            for (node_name, intf_name), value in sorted(column.items()):
+                interface = "%s:%s" % (node_name, intf_name)
+                values.append((interface, value))
+
+        return (("Node:Interface", parsed_args.field), values)
+
+    def take_file_action(self, parsed_args):
+        values = []
+        with binreport.open_report(parsed_args.from_file) as report:
+            if parsed_args.node is not None:
+                node_ids = [parsed_args.node]
+            else:
+                node_ids = report.node_ids()
+            for node_id in node_ids:
+                interfaces = report.node(node_id, parsed_args.interface)
+                for intf_name, bindings in sorted((interfaces or {}).items()):
+                    if parsed_args.field in bindings:
+                        values.append(("%s:%s" % (node_id, intf_name),
+                                       bindings[parsed_args.field]))
 
         return (("Node:Interface", parsed_args.field), values)
+
+
+class Report(Command):
+    "produce several reports in json format from one pass over all nodes"
+
+    def get_parser(self, prog_name):
+        parser = super(Report, self).get_parser(prog_name)
+        parser.add_argument("--node", metavar="<node>",
+                            help="name or UUID of the node")
+        parser.add_argument("--interface", metavar="<interface>",
+                            help="interface name")
+        parser.add_argument("--bindings", action="store_true",
+                            help="include the field bindings of each "
+                                 "interface, as written by 'save'")
+        parser.add_argument("--vlans", action="store_true",
+                            help="include the interfaces on each VLAN")
+        parser.add_argument("--topology", action="store_true",
+                            help="include the interfaces on each switch port")
+        parser.add_argument("--field", metavar="<field_name>",
+                            action="append", default=[],
+                            help="include the value of a field on each "
+                                 "interface, may be repeated")
+        parser.add_argument("--file", metavar="<filename>", default=None,
+                            help="write output to file")
+        return parser
+
+    def take_action(self, parsed_args):
+        sections = []
+        if parsed_args.bindings:
+            sections.append(("bindings", BindingsAggregator()))
+        if parsed_args.vlans:
+            sections.append(("vlans", VlanAggregator()))
+        if parsed_args.topology:
+            sections.append(("topology", TopologyAggregator()))
+        for field in parsed_args.field:
+            sections.append((field, FieldAggregator(field)))
+
+        results = new_reporter(self.app).aggregate(
+            parsed_args, [aggregator for name, aggregator in sections])
+
+        report = {}
+        fields = {}
+        for (name, aggregator), result in zip(sections, results):
+            if isinstance(aggregator, FieldAggregator):
+                fields[name] = dict(result)
+            else:
+                report[name] = result
+        if fields:
+            report["fields"] = fields
+
+        if parsed_args.file:
+            with open(parsed_args.file, 'w') as fp:
+                json.dump(report, fp, sort_keys=True)
+        else:
+            json.dump(report, sys.stdout, sort_keys=True)
+
+
+def _add_store_argument(parser):
+    parser.add_argument("--store", metavar="<directory>", default=None,
+                        help="snapshot store directory, defaults to "
+                             "$LLDPREPORT_SNAPSHOT_DIR or "
+                             "~/.lldpreport/snapshots")
+
+
+class SnapshotSave(Command):
+    "save the LLDP report for all nodes as a snapshot"
+
+    def get_parser(self, prog_name):
+        parser = super(SnapshotSave, self).get_parser(prog_name)
+        _add_store_argument(parser)
+        parser.add_argument("--name", metavar="<name>", default=None,
+                            help="snapshot name, defaults to the current "
+                                 "UTC time")
+        parser.add_argument("--from-file", metavar="<filename>",
+                            default=None,
+                            help="import a report written by 'save' "
+                                 "instead of fetching one")
+        # Snapshots always hold every node and interface
+        parser.set_defaults(node=None, interface=None)
+        return parser
+
+    def take_action(self, parsed_args):
+        failed_nodes = ()
+        if parsed_args.from_file:
+            report = binreport.load_report(parsed_args.from_file)
+        else:
+            reporter = new_reporter(self.app)
+            report, = reporter.aggregate(parsed_args, [BindingsAggregator()])
+            failed_nodes = reporter.failed_nodes
+
+        store = snapshot.SnapshotStore(parsed_args.store)
+        # Nodes that could not be fetched have not changed as far as we know
+        name = store.save(report, parsed_args.name, keep=failed_nodes)
+        self.app.stdout.write(name + "\n")
+
+
+class SnapshotList(Lister):
+    "show the saved snapshots"
+
+    def get_parser(self, prog_name):
+        parser = super(SnapshotList, self).get_parser(prog_name)
+        _add_store_argument(parser)
+        parser.add_argument("--since", metavar="<name>", default=None,
+                            help="first snapshot or date prefix, e.g. "
+                                 "20160901")
+        parser.add_argument("--until", metavar="<name>", default=None,
+                            help="last snapshot or date prefix")
+        return parser
+
+    def take_action(self, parsed_args):
+        store = snapshot.SnapshotStore(parsed_args.store)
+        names = store.list(parsed_args.since, parsed_args.until)
+
+        return (("Snapshot",), list((name,) for name in names))
+
+
+class SnapshotShow(Command):
+    "display a snapshot in the json format written by 'save'"
+
+    def get_parser(self, prog_name):
+        parser = super(SnapshotShow, self).get_parser(prog_name)
+        _add_store_argument(parser)
+        parser.add_argument("name", metavar="<name>", help="snapshot name")
+        parser.add_argument("--node", metavar="<node>",
+                            help="UUID of the node")
+        return parser
+
+    def take_action(self, parsed_args):
+        store = snapshot.SnapshotStore(parsed_args.store)
+        report = store.load(parsed_args.name, parsed_args.node)
+
+        json.dump(report, sys.stdout, sort_keys=True)
+
+
+class SnapshotHistory(Lister):
+    "show the changes to each interface between snapshots"
+
+    def get_parser(self, prog_name):
+        parser = super(SnapshotHistory, self).get_parser(prog_name)
+        _add_store_argument(parser)
+        parser.add_argument("--node", metavar="<node>",
+                            help="UUID of the node")
+        parser.add_argument("--interface", metavar="<interface>",
+                            help="interface name")
+        parser.add_argument("--since", metavar="<name>", default=None,
+                            help="first snapshot or date prefix, e.g. "
+                                 "20160901")
+        parser.add_argument("--until", metavar="<name>", default=None,
+                            help="last snapshot or date prefix")
+        return parser
+
+    def take_action(self, parsed_args):
+        store = snapshot.SnapshotStore(parsed_args.store)
+
+        changes = []
+        for name, node_id, intf_name, old, new in store.history(
+                parsed_args.node, parsed_args.interface,
+                parsed_args.since, parsed_args.until):
+            if old is None:
+                change = "added"
+                fields = []
+            elif new is None:
+                change = "removed"
+                fields = []
+            else:
+                change = "changed"
+                fields = sorted(field for field in set(old) | set(new)
+                                if old.get(field) != new.get(field))
+            interface = "%s:%s" % (node_id, intf_name)
+            changes.append((name, interface, change, fields))
+
+        return (("Snapshot", "Node:Interface", "Change", "Fields"), changes)
+
+
+class Validate(Lister):
+    "check VLANs, MTU and link aggregation against the expected config"
+
+    def get_parser(self, prog_name):
+        parser = super(Validate, self).get_parser(prog_name)
+        parser.add_argument("expected", metavar="<filename>",
+                            help="json or yaml file mapping node UUID to "
+                                 "interface to the expected vlans, "
+                                 "native_vlan, mtu and lag")
+        parser.add_argument("--node", metavar="<node>",
+                            help="name or UUID of the node")
+        parser.set_defaults(interface=None)
+        return parser
+
+    def take_action(self, parsed_args):
+        expected = clouds.load_config_file(parsed_args.expected) or {}
+
+        reporter = new_reporter(self.app)
+        mismatches, = reporter.aggregate(
+            parsed_args, [ValidateAggregator(expected, reporter.failed_nodes)],
+            node_filter=set(expected))
+        self.mismatch_count = len(mismatches)
+
+        return (("Node", "Interface", "Check", "Expected", "Actual"),
+                list((m['node'], m['interface'], m['check'], m['expected'],
+                      m['actual']) for m in mismatches))
+
+    def run(self, parsed_args):
+        # Fail when there are mismatches, for use as a deployment gate
+        result = super(Validate, self).run(parsed_args)
+        if self.mismatch_count:
+            return 1
+        return result
+
+
+class Lookup(Lister):
+    "find nodes and interfaces by MAC address, switch port or node name"
+
+    def get_parser(self, prog_name):
+        parser = super(Lookup, self).get_parser(prog_name)
+        parser.add_argument("--mac", metavar="<mac>",
+                            help="MAC address of a node interface")
+        parser.add_argument("--switch", metavar="<switch>",
+                            help="switch system name or chassis ID, "
+                                 "used with --port")
+        parser.add_argument("--port", metavar="<port>",
+                            help="switch port ID, used with --switch")
+        parser.add_argument("--node-name", metavar="<name>",
+                            help="name of the node")
+        parser.add_argument("--refresh", action="store_true",
+                            help="fetch the report and update the index "
+                                 "for nodes that changed")
+        parser.add_argument("--from-file", metavar="<filename>",
+                            default=None,
+                            help="update the index from a report written "
+                                 "by 'save'")
+        parser.add_argument("--index", metavar="<filename>", default=None,
+                            help="index file, defaults to "
+                                 "$LLDPREPORT_INDEX or "
+                                 "~/.lldpreport/index.json")
+        parser.set_defaults(node=None, interface=None)
+        return parser
+
+    def refresh(self, report_index, report, node_names=None, missing=None):
+        """Index the nodes of a report, saving the index if it changed.
+
+        Without node_names the indexed names of the nodes are kept. Nodes
+        are only removed when missing, a reporter's node_missing, says
+        they are gone, so a report file or an unreachable region does not
+        prune nodes it does not have.
+        """
+        changed = 0
+        for node_id, interfaces in report.items():
+            if node_names is None:
+                name = report_index.nodes.get(node_id, {}).get('name')
+            else:
+                name = node_names.get(node_id)
+            if report_index.update_node(node_id, name, interfaces):
+                changed += 1
+        if missing is not None:
+            for node_id in set(report_index.nodes) - set(report):
+                if missing(node_id):
+                    report_index.remove_node(node_id)
+                    changed += 1
+        if changed:
+            report_index.save()
+
+    def take_action(self, parsed_args):
+        if parsed_args.from_file or parsed_args.refresh:
+            report_index = index.ReportIndex(parsed_args.index).load()
+        if parsed_args.from_file:
+            self.refresh(report_index,
+                         binreport.load_report(parsed_args.from_file))
+        elif parsed_args.refresh:
+            reporter = new_reporter(self.app)
+            report, = reporter.aggregate(parsed_args, [BindingsAggregator()])
+            self.refresh(report_index, report, reporter.node_names,
+                         reporter.node_missing)
+
+        # Lookups only read the lookup tables, not the whole index
+        entries = []
+        with index.open_lookups(parsed_args.index) as lookups:
+            if parsed_args.mac:
+                entries.extend(lookups.by_mac(parsed_args.mac))
+            if parsed_args.switch or parsed_args.port:
+                entries.extend(lookups.by_switch_port(parsed_args.switch,
+                                                      parsed_args.port))
+            if parsed_args.node_name:
+                entries.extend(lookups.by_node_name(parsed_args.node_name))
+
+        rows = []
+        for entry in entries:
+            rows.append((entry['node'], entry['name'], entry['interface'],
+                         entry['mac'], entry['switch'], entry['port']))
+
+        return (("Node", "Name", "Interface", "MAC", "Switch", "Port"), rows)
+
+
+class Metrics(Command):
+    "export fleet LLDP and fetch metrics in the Prometheus text format"
+
+    def get_parser(self, prog_name):
+        parser = super(Metrics, self).get_parser(prog_name)
+        parser.add_argument("--textfile", metavar="<filename>", default=None,
+                            help="write metrics to a node exporter "
+                                 "textfile instead of stdout")
+        parser.add_argument("--listen", metavar="<port>", type=int,
+                            default=None,
+                            help="serve metrics over HTTP on this port and "
+                                 "refresh them every --interval seconds")
+        parser.add_argument("--interval", metavar="<seconds>", type=float,
+                            default=300,
+                            help="seconds between refreshes with --listen")
+        parser.set_defaults(node=None, interface=None)
+        return parser
+
+    def refresh(self, fleet, parsed_args):
+        reporter = new_reporter(self.app)
+        reporter.scheduler.observe = fleet.observe_fetch
+        report, = reporter.aggregate(parsed_args, [BindingsAggregator()])
+
+        # Only nodes whose bindings changed update the fleet metrics
+        for node_id, interfaces in report.items():
+            node = reporter.errors.nodes.get(node_id)
+            if node is not None and node['errors']:
+                # Keep the last known contribution of the node
+                continue
+            fleet.update_node(node_id, interfaces)
+        for node_id in list(fleet.nodes):
+            if reporter.node_missing(node_id):
+                fleet.remove_node(node_id)
+        fleet.decode_errors = reporter.errors.error_count
+        fleet.unknown_tlvs = reporter.errors.unknown_count
+        fleet.refresh_time = time.time()
+
+        if parsed_args.textfile:
+            metrics.write_textfile(parsed_args.textfile, fleet.render())
+
+    def take_action(self, parsed_args):
+        fleet = metrics.FleetMetrics()
+
+        if parsed_args.listen is None:
+            self.refresh(fleet, parsed_args)
+            if not parsed_args.textfile:
+                self.app.stdout.write(fleet.render())
+            return
+
+        metrics.serve(fleet, parsed_args.listen)
+        while True:
+            try:
+                self.refresh(fleet, parsed_args)
+            except Exception:
+                # Keep serving the last metrics until the next refresh
+                LOG.exception("Failed to refresh LLDP metrics")
+            time.sleep(parsed_args.interval)
+
+
+class Watch(Command):
+    "print LLDP changes as they happen, one json event per line"
+
+    def get_parser(self, prog_name):
+        parser = super(Watch, self).get_parser(prog_name)
+        parser.add_argument("--node", metavar="<node>", default=None,
+                            help="UUID of the node to watch")
+        parser.add_argument("--interval", metavar="<seconds>", type=float,
+                            default=WATCH_INTERVAL,
+                            help="seconds between polls")
+        parser.set_defaults(interface=None)
+        return parser
+
+    def emit(self, events):
+        for event, node_id, intf_name, details in events:
+            record = {
+                'time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+                'event': event,
+                'node': node_id,
+                'interface': intf_name,
+            }
+            record.update(details)
+            self.app.stdout.write(json.dumps(record, sort_keys=True) + '\n')
+        self.app.stdout.flush()
+
+    def poll(self, tracker, parsed_args):
+        reporter = new_reporter(self.app)
+        reporter.node_fields = WATCH_NODE_FIELDS
+
+        # Only nodes inspected since the last poll are fetched
+        stale = tracker.stale_nodes(reporter.inspected)
+        aggregator = BindingsAggregator()
+        for node_id, interfaces in reporter.aggregate(
+                parsed_args, [aggregator], stale)[0].items():
+            node = reporter.errors.nodes.get(node_id)
+            if node is not None and node['errors']:
+                # Leave the node stale so the next poll fetches it again
+                continue
+            self.emit(tracker.update_node(
+                node_id, reporter.inspected.get(node_id), interfaces))
+
+        for node_id in list(tracker.nodes):
+            if reporter.node_missing(node_id):
+                self.emit(tracker.remove_node(node_id))
+
+    def take_action(self, parsed_args):
+        tracker = watch.ChangeTracker()
+        while True:
+            try:
+                self.poll(tracker, parsed_args)
+            except Exception:
+                LOG.exception("Failed to poll LLDP data")
+            time.sleep(parsed_args.interval)
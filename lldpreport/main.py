@@ -14,10 +14,13 @@
 # under the License.
 
 import sys
+import time
 
 from cliff.app import App
 from cliff.commandmanager import CommandManager
 
+from lldpreport import lldp
+
 class LldpReport(App):
 
     def __init__(self):
@@ -28,6 +31,30 @@ class LldpReport(App):
             deferred_help=True,
             )
 
+    def build_option_parser(self, description, version, *args, **kwargs):
+        parser = super(LldpReport, self).build_option_parser(
+            description, version, *args, **kwargs)
+        parser.add_argument('--timing', action='store_true', default=False,
+                            help='print elapsed time and decode statistics')
+        parser.add_argument('--os-cloud', metavar='<name>', action='append',
+                            dest='os_clouds', default=[],
+                            help='cloud from clouds.yaml to report on, '
+                                 'repeat to report on several regions at '
+                                 'once (default: OS_* environment)')
+        return parser
+
+    def prepare_to_run_command(self, cmd):
+        self.start_time = time.time()
+
+    def clean_up(self, cmd, result, err):
+        if not self.options.timing:
+            return
+
+        self.stderr.write("elapsed_time: %.3f\n" %
+                          (time.time() - self.start_time))
+        for name, value in sorted(lldp.decode_cache.stats().items()):
+            self.stderr.write("%s: %s\n" % (name, value))
+
 def main(argv=sys.argv[1:]):
     myapp = LldpReport()
     return myapp.run(argv)
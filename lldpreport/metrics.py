@@ -0,0 +1,222 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+from collections import Counter
+from collections import defaultdict
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+
+from lldpreport import snapshot
+
+# Upper bounds in seconds of the fetch latency histogram buckets
+FETCH_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Type and help text of each metric family
+METRIC_FAMILIES = {
+    'lldp_nodes': ('gauge', "Nodes in the last LLDP report"),
+    'lldp_switch_ports': ('gauge', "Node interfaces cabled to each switch"),
+    'lldp_switch_mtu_mismatches': (
+        'gauge', "Ports of each switch not at its most common MTU"),
+    'lldp_vlan_interfaces': ('gauge', "Node interfaces on each VLAN"),
+    'lldp_decode_errors': ('gauge', "TLV decode errors in the last report"),
+    'lldp_unknown_tlvs': ('gauge', "Unknown TLVs in the last report"),
+    'lldp_refresh_timestamp_seconds': (
+        'gauge', "Time of the last refresh of the LLDP report"),
+    'lldp_fetch_duration_seconds': (
+        'histogram', "Time to fetch the introspection data of a node"),
+}
+
+
+def _family(name):
+    # Histogram samples are named after their family with a suffix
+    if name not in METRIC_FAMILIES:
+        for suffix in ('_bucket', '_sum', '_count'):
+            if name.endswith(suffix):
+                return name[:-len(suffix)]
+    return name
+
+
+def _escape(value):
+    return ('%s' % value).replace('\\', '\\\\').replace(
+        '"', '\\"').replace('\n', '\\n')
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (name, _escape(value))
+                             for name, value in labels)
+
+
+class Histogram():
+    """Prometheus style histogram with cumulative buckets."""
+
+    def __init__(self, buckets=FETCH_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.count += 1
+        self.sum += value
+
+    def samples(self, name, labels):
+        for bound, count in zip(self.buckets, self.counts):
+            yield name + '_bucket', labels + [('le', bound)], count
+        yield name + '_bucket', labels + [('le', '+Inf')], self.count
+        yield name + '_sum', labels, self.sum
+        yield name + '_count', labels, self.count
+
+
+class FleetMetrics():
+    """Fleet LLDP metrics, updated node by node on each refresh.
+
+    Each node's contribution to the per-switch and per-VLAN counts is kept
+    with the digest of its bindings, so a refresh only applies the
+    difference for nodes that changed.
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.switch_ports = Counter()
+        self.vlan_interfaces = Counter()
+        self.switch_mtus = defaultdict(Counter)
+        self.fetch_latency = defaultdict(Histogram)
+        self.decode_errors = 0
+        self.unknown_tlvs = 0
+        self.refresh_time = None
+        self._lock = threading.Lock()
+
+    def _apply(self, contribution, sign):
+        for switch, vlans, mtu in contribution:
+            self.switch_ports[switch] += sign
+            for vlan in vlans:
+                self.vlan_interfaces[vlan] += sign
+            if mtu is not None:
+                self.switch_mtus[switch][mtu] += sign
+
+    def update_node(self, node_id, interfaces):
+        """Update the metrics of a node from its interface bindings."""
+        digest = snapshot.bindings_digest(interfaces)
+        with self._lock:
+            old = self.nodes.get(node_id)
+            if old is not None and old[0] == digest:
+                return False
+
+            contribution = []
+            for bindings in interfaces.values():
+                switch = bindings.get('switch_system_name') or \
+                    bindings.get('switch_chassis_id')
+                if switch is None:
+                    continue
+                contribution.append((switch,
+                                     bindings.get('switch_port_vlans') or [],
+                                     bindings.get('switch_port_mtu')))
+
+            if old is not None:
+                self._apply(old[1], -1)
+            self._apply(contribution, 1)
+            self.nodes[node_id] = (digest, contribution)
+            return True
+
+    def remove_node(self, node_id):
+        with self._lock:
+            old = self.nodes.pop(node_id, None)
+            if old is not None:
+                self._apply(old[1], -1)
+
+    def observe_fetch(self, endpoint, seconds, success):
+        with self._lock:
+            self.fetch_latency[endpoint].observe(seconds)
+
+    def mtu_mismatches(self):
+        """Return the ports on each switch not at its most common MTU."""
+        mismatches = {}
+        for switch, mtus in self.switch_mtus.items():
+            total = sum(mtus.values())
+            if total:
+                mismatches[switch] = total - max(mtus.values())
+        return mismatches
+
+    def samples(self):
+        yield 'lldp_nodes', [], len(self.nodes)
+        for switch, count in sorted(self.switch_ports.items()):
+            if count:
+                yield 'lldp_switch_ports', [('switch', switch)], count
+        for switch, count in sorted(self.mtu_mismatches().items()):
+            yield 'lldp_switch_mtu_mismatches', [('switch', switch)], count
+        for vlan, count in sorted(self.vlan_interfaces.items()):
+            if count:
+                yield 'lldp_vlan_interfaces', [('vlan', vlan)], count
+        yield 'lldp_decode_errors', [], self.decode_errors
+        yield 'lldp_unknown_tlvs', [], self.unknown_tlvs
+        if self.refresh_time is not None:
+            yield 'lldp_refresh_timestamp_seconds', [], self.refresh_time
+        for endpoint, histogram in sorted(self.fetch_latency.items()):
+            for sample in histogram.samples('lldp_fetch_duration_seconds',
+                                            [('endpoint', endpoint)]):
+                yield sample
+
+    def render(self):
+        """Return the metrics in the Prometheus text format."""
+        lines = []
+        family = None
+        with self._lock:
+            for name, labels, value in self.samples():
+                if _family(name) != family:
+                    family = _family(name)
+                    metric_type, help_text = METRIC_FAMILIES[family]
+                    lines.append('# HELP %s %s' % (family, help_text))
+                    lines.append('# TYPE %s %s' % (family, metric_type))
+                lines.append('%s%s %s' % (name, _labels(labels), value))
+        return '\n'.join(lines) + '\n'
+
+
+def write_textfile(path, text):
+    """Write metrics for the node exporter textfile collector."""
+    # Rename into place so the collector never reads a partial file
+    snapshot.write_file(path, text)
+
+
+def serve(metrics, port, address=''):
+    """Serve the metrics over HTTP from a background thread."""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type',
+                             'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = HTTPServer((address, port), MetricsHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
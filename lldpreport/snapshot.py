@@ -0,0 +1,194 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import hashlib
+import json
+import os
+import time
+
+# Snapshot names are UTC timestamps, so they sort in time order and a
+# prefix such as "201609" selects a time range
+SNAPSHOT_NAME_FORMAT = '%Y%m%dT%H%M%SZ'
+
+
+def default_store_path():
+    return os.environ.get('LLDPREPORT_SNAPSHOT_DIR') or os.path.join(
+        os.path.expanduser('~'), '.lldpreport', 'snapshots')
+
+
+def encode_bindings(bindings):
+    """Return the canonical json encoding of interface bindings."""
+    return json.dumps(bindings, sort_keys=True,
+                      separators=(',', ':')).encode('utf-8')
+
+
+def bindings_digest(bindings):
+    """Return the sha256 of the canonical encoding of bindings.
+
+    Equal bindings have equal digests, so comparing digests tells whether
+    a node or interface changed without comparing the bindings.
+    """
+    return hashlib.sha256(encode_bindings(bindings)).hexdigest()
+
+
+def write_file(path, contents):
+    """Replace a file with contents, given as bytes or text.
+
+    The contents are written to a temporary file which is renamed into
+    place, so readers never see a partial file.
+    """
+    mode = 'wb' if isinstance(contents, bytes) else 'w'
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    with open(tmp_path, mode) as fp:
+        fp.write(contents)
+    os.rename(tmp_path, path)
+
+
+class SnapshotStore():
+    """Store of LLDP reports with content-addressed interface bindings.
+
+    The bindings of each interface are stored once under the sha256 of
+    their canonical json encoding, in objects/. A snapshot is a manifest
+    in snapshots/ mapping each node and interface to the hash of its
+    bindings, so the store only grows when the cabling changes.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_store_path()
+        self.objects_path = os.path.join(self.path, 'objects')
+        self.snapshots_path = os.path.join(self.path, 'snapshots')
+        self._objects = {}
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_path, digest[:2], digest[2:])
+
+    def _manifest_path(self, name):
+        return os.path.join(self.snapshots_path, name + '.json')
+
+    def put_bindings(self, bindings):
+        """Store interface bindings and return their hash."""
+        contents = encode_bindings(bindings)
+        digest = hashlib.sha256(contents).hexdigest()
+        path = self._object_path(digest)
+        if not os.path.exists(path):
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            write_file(path, contents)
+        return digest
+
+    def get_bindings(self, digest):
+        """Return the interface bindings stored under a hash."""
+        bindings = self._objects.get(digest)
+        if bindings is None:
+            with open(self._object_path(digest), 'rb') as fp:
+                bindings = json.loads(fp.read().decode('utf-8'))
+            self._objects[digest] = bindings
+        return bindings
+
+    def save(self, report, name=None, keep=()):
+        """Store a report, as written by save, and return its name.
+
+        Nodes in keep but not in the report, such as nodes that could not
+        be fetched, keep their bindings from the latest snapshot.
+        """
+        if name is None:
+            name = time.strftime(SNAPSHOT_NAME_FORMAT, time.gmtime())
+
+        nodes = {}
+        for node_id, intf_dict in report.items():
+            nodes[node_id] = dict(
+                (intf_name, self.put_bindings(bindings))
+                for intf_name, bindings in intf_dict.items())
+
+        missing = [node_id for node_id in keep if node_id not in nodes]
+        names = self.list()
+        if missing and names:
+            latest = self.manifest(names[-1])
+            for node_id in missing:
+                if node_id in latest:
+                    nodes[node_id] = latest[node_id]
+
+        if not os.path.isdir(self.snapshots_path):
+            os.makedirs(self.snapshots_path)
+        manifest = json.dumps({'name': name, 'nodes': nodes}, sort_keys=True)
+        write_file(self._manifest_path(name), manifest.encode('utf-8'))
+        return name
+
+    def list(self, since=None, until=None):
+        """Return the snapshot names in time order.
+
+        since and until are inclusive name prefixes, so "20160901" and
+        "201609" both select by date.
+        """
+        if not os.path.isdir(self.snapshots_path):
+            return []
+
+        names = []
+        for filename in os.listdir(self.snapshots_path):
+            if not filename.endswith('.json'):
+                continue
+            name = filename[:-len('.json')]
+            if since is not None and name < since:
+                continue
+            if until is not None and name[:len(until)] > until:
+                continue
+            names.append(name)
+        return sorted(names)
+
+    def manifest(self, name):
+        """Return the node -> interface -> hash mapping of a snapshot."""
+        with open(self._manifest_path(name), 'r') as fp:
+            return json.load(fp)['nodes']
+
+    def load(self, name, node_id=None):
+        """Return a snapshot in the format written by save."""
+        report = {}
+        for manifest_node, intf_dict in self.manifest(name).items():
+            if node_id is not None and node_id != manifest_node:
+                continue
+            report[manifest_node] = dict(
+                (intf_name, self.get_bindings(digest))
+                for intf_name, digest in intf_dict.items())
+        return report
+
+    def history(self, node_id=None, interface=None, since=None, until=None):
+        """Yield the changes to interface bindings between snapshots.
+
+        Each change is (snapshot, node, interface, old bindings, new
+        bindings), where the old or new bindings are None when the
+        interface appears or disappears. Only manifests are compared, the
+        bindings are only read for interfaces that changed.
+        """
+        previous = {}
+        for name in self.list(since, until):
+            current = {}
+            for manifest_node, intf_dict in self.manifest(name).items():
+                if node_id is not None and node_id != manifest_node:
+                    continue
+                for intf_name, digest in intf_dict.items():
+                    if interface is not None and interface != intf_name:
+                        continue
+                    current[(manifest_node, intf_name)] = digest
+
+            for key in sorted(set(previous) | set(current)):
+                old = previous.get(key)
+                new = current.get(key)
+                if old == new:
+                    continue
+                yield (name, key[0], key[1],
+                       self.get_bindings(old) if old else None,
+                       self.get_bindings(new) if new else None)
+
+            previous = current
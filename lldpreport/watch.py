@@ -0,0 +1,121 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+from lldpreport import snapshot
+
+# Fields identifying the switch port an interface is cabled to
+NEIGHBOR_FIELDS = ('switch_chassis_id', 'switch_system_name',
+                   'switch_port_id')
+
+VLANS_FIELD = 'switch_port_vlans'
+MTU_FIELD = 'switch_port_mtu'
+
+
+def diff_bindings(old, new):
+    """Yield (event, details) for the changes between interface bindings."""
+    if any(old.get(field) != new.get(field) for field in NEIGHBOR_FIELDS):
+        yield 'neighbor_changed', {
+            'old': dict((field, old.get(field)) for field in NEIGHBOR_FIELDS),
+            'new': dict((field, new.get(field)) for field in NEIGHBOR_FIELDS),
+        }
+
+    old_vlans = set(old.get(VLANS_FIELD) or [])
+    new_vlans = set(new.get(VLANS_FIELD) or [])
+    for vlan in sorted(new_vlans - old_vlans):
+        yield 'vlan_added', {'vlan': vlan}
+    for vlan in sorted(old_vlans - new_vlans):
+        yield 'vlan_removed', {'vlan': vlan}
+
+    if old.get(MTU_FIELD) != new.get(MTU_FIELD):
+        yield 'mtu_changed', {'old': old.get(MTU_FIELD),
+                              'new': new.get(MTU_FIELD)}
+
+    known = set(NEIGHBOR_FIELDS) | set([VLANS_FIELD, MTU_FIELD])
+    fields = sorted(field for field in set(old) | set(new)
+                    if field not in known and old.get(field) != new.get(field))
+    if fields:
+        yield 'bindings_changed', {'fields': fields}
+
+
+class StaleNodes():
+    """The nodes inspected again since they were last fetched.
+
+    This is used as the node filter of a report. Membership is only
+    tested once the node list, and so inspected, has been read.
+    """
+
+    def __init__(self, marks, inspected):
+        self.marks = marks
+        self.inspected = inspected
+
+    def __contains__(self, node_id):
+        return (node_id not in self.marks or
+                self.marks[node_id] != self.inspected.get(node_id))
+
+
+class ChangeTracker():
+    """Track the bindings of each interface and report what changed.
+
+    Each interface is kept with the sha256 of its bindings, so only the
+    interfaces whose hash changed are compared field by field. The time a
+    node was last inspected is kept too: introspection data only changes
+    when a node is inspected again, so only those nodes are fetched.
+    """
+
+    def __init__(self):
+        self.marks = {}
+        self.nodes = {}
+
+    def stale_nodes(self, inspected):
+        return StaleNodes(self.marks, inspected)
+
+    def update_node(self, node_id, mark, interfaces):
+        """Record the bindings of a node and return its change events.
+
+        Each event is (event, node, interface, details). The first update
+        of a node only records its bindings.
+        """
+        old_interfaces = self.nodes.get(node_id)
+        new_interfaces = {}
+        for intf_name, bindings in interfaces.items():
+            digest = snapshot.bindings_digest(bindings)
+            new_interfaces[intf_name] = (digest, bindings)
+        self.marks[node_id] = mark
+        self.nodes[node_id] = new_interfaces
+
+        events = []
+        if old_interfaces is None:
+            return events
+
+        for intf_name in sorted(set(old_interfaces) | set(new_interfaces)):
+            old = old_interfaces.get(intf_name)
+            new = new_interfaces.get(intf_name)
+            if old is None:
+                events.append(('interface_added', node_id, intf_name,
+                               {'new': new[1]}))
+            elif new is None:
+                events.append(('interface_removed', node_id, intf_name,
+                               {'old': old[1]}))
+            elif old[0] != new[0]:
+                for event, details in diff_bindings(old[1], new[1]):
+                    events.append((event, node_id, intf_name, details))
+        return events
+
+    def remove_node(self, node_id):
+        """Forget a node and return its removal event."""
+        self.marks.pop(node_id, None)
+        if self.nodes.pop(node_id, None) is None:
+            return []
+        return [('node_removed', node_id, None, {})]
@@ -38,7 +38,7 @@ setup(
     provides=[],
 
     namespace_packages=[],
-    packages=find_packages(),
+    packages=find_packages(exclude=['tests', 'tests.*']),
     include_package_data=True,
 
     entry_points={
@@ -48,9 +48,18 @@ setup(
         'lldpcommands': [
             'interface list = lldpreport.lldp:InterfaceList',
             'interface show = lldpreport.lldp:InterfaceShow',
-            'vlan list = lldpreport.lldp:VlanShow',
+            'vlan list = lldpreport.lldp:VlanList',
             'save = lldpreport.lldp:Save',
             'field show = lldpreport.lldp:FieldShow',
+            'report = lldpreport.lldp:Report',
+            'snapshot save = lldpreport.lldp:SnapshotSave',
+            'snapshot list = lldpreport.lldp:SnapshotList',
+            'snapshot show = lldpreport.lldp:SnapshotShow',
+            'snapshot history = lldpreport.lldp:SnapshotHistory',
+            'validate = lldpreport.lldp:Validate',
+            'lookup = lldpreport.lldp:Lookup',
+            'metrics = lldpreport.lldp:Metrics',
+            'watch = lldpreport.lldp:Watch',
         ],
     },
 
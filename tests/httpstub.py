@@ -0,0 +1,82 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import threading
+import unittest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.error import HTTPError
+    from urllib.request import urlopen
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urllib2 import HTTPError, urlopen
+
+
+class StubHTTPError(Exception):
+    """Error carrying a status code, like the ironic client errors."""
+
+    def __init__(self, http_status):
+        super(StubHTTPError, self).__init__("HTTP %d" % http_status)
+        self.http_status = http_status
+
+
+class StubServer(ThreadingMixIn, HTTPServer):
+    """Local json API stub, served from a thread by StubServerTestCase."""
+
+    daemon_threads = True
+    # Fetch threads and the node list connect at once
+    request_queue_size = 64
+
+    def __init__(self, handler):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), handler)
+        self.lock = threading.Lock()
+        self.url = 'http://127.0.0.1:%d' % self.server_address[1]
+
+    def get(self, path):
+        """Return the decoded json response to a GET of path."""
+        try:
+            response = urlopen(self.url + path)
+        except HTTPError as e:
+            raise StubHTTPError(e.code)
+        return json.loads(response.read().decode('utf-8'))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def send_json(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(json.dumps(body).encode('utf-8'))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubServerTestCase(unittest.TestCase):
+
+    def start_server(self, server):
+        """Serve from a thread until the test is cleaned up."""
+        thread = threading.Thread(target=server.serve_forever,
+                                  args=(0.05,))
+        thread.daemon = True
+        thread.start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return server
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from lldpreport import binreport
+
+REPORT = {
+    'uuid-1': {
+        'eth0': {'switch_system_name': 'sw1',
+                 'switch_port_id': 'Eth1/1',
+                 'switch_port_mtu': '9000',
+                 'switch_port_vlans': ['100', '200']},
+        'eth1': {'switch_system_name': 'sw2',
+                 'switch_port_id': 'Eth1/1',
+                 'switch_port_mtu': '9000'},
+    },
+    'uuid-2': {
+        'eth0': {'switch_system_name': 'sw1',
+                 'switch_port_id': 'Eth1/2',
+                 'switch_port_vlans': ['100', '200']},
+    },
+    # A node without LLDP data
+    'uuid-3': {},
+}
+
+
+class BinReportTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def write(self, report, name='report.bin'):
+        path = os.path.join(self.tmpdir, name)
+        binreport.write_report(path, report)
+        return path
+
+
+class TestBinaryReport(BinReportTestCase):
+
+    def test_round_trip(self):
+        path = self.write(REPORT)
+        self.assertTrue(binreport.is_binary_report(path))
+        self.assertEqual(REPORT, binreport.load_report(path))
+        with binreport.BinaryReport(path) as report:
+            self.assertEqual(sorted(REPORT), report.node_ids())
+            self.assertEqual(REPORT['uuid-2'], report.node('uuid-2'))
+            self.assertIn('uuid-1', report)
+            self.assertNotIn('uuid-4', report)
+            self.assertIsNone(report.node('uuid-4'))
+
+    def test_strings_shared(self):
+        encoded = binreport.encode_report(REPORT)
+        self.assertEqual(1, encoded.count(b'Eth1/1'))
+        self.assertEqual(1, encoded.count(b'["100", "200"]'))
+
+    def test_empty_report(self):
+        path = self.write({})
+        with binreport.BinaryReport(path) as report:
+            self.assertEqual([], report.node_ids())
+            self.assertIsNone(report.node('uuid-1'))
+            self.assertEqual({}, report.report())
+
+    def test_node_without_interfaces(self):
+        path = self.write({'uuid-3': {}})
+        with binreport.BinaryReport(path) as report:
+            self.assertEqual({}, report.node('uuid-3'))
+            self.assertEqual({}, report.node('uuid-3', 'eth0'))
+
+    def test_non_ascii_node_ids(self):
+        node_ids = [u'région/uuid-1', u'region/uuid-2', u'Łódź',
+                    u'日本/uuid-3', u'Zone/uuid-4', u'\U0001f5a5']
+        path = self.write(dict((node_id, REPORT['uuid-2'])
+                               for node_id in node_ids))
+        with binreport.BinaryReport(path) as report:
+            self.assertEqual(sorted(node_ids), report.node_ids())
+            for node_id in node_ids:
+                self.assertEqual(REPORT['uuid-2'], report.node(node_id))
+
+    def test_node_interface(self):
+        path = self.write(REPORT)
+        with binreport.BinaryReport(path) as report:
+            self.assertEqual({'eth1': REPORT['uuid-1']['eth1']},
+                             report.node('uuid-1', 'eth1'))
+            # Only the strings of the requested interface were read
+            strings = set(report._strings.values())
+            self.assertIn('"sw2"', strings)
+            self.assertNotIn('"sw1"', strings)
+            self.assertNotIn('switch_port_vlans', strings)
+
+            self.assertEqual({}, report.node('uuid-1', 'eth2'))
+
+    def test_not_binary(self):
+        path = os.path.join(self.tmpdir, 'report.json')
+        with open(path, 'w') as fp:
+            json.dump(REPORT, fp)
+        self.assertRaises(ValueError, binreport.BinaryReport, path)
+
+
+class TestOpenReport(BinReportTestCase):
+
+    def test_json_fallback(self):
+        path = os.path.join(self.tmpdir, 'report.json')
+        with open(path, 'w') as fp:
+            json.dump(REPORT, fp)
+
+        self.assertFalse(binreport.is_binary_report(path))
+        with binreport.open_report(path) as report:
+            self.assertIsInstance(report, binreport.JsonReport)
+            self.assertEqual(sorted(REPORT), report.node_ids())
+            self.assertEqual({'eth1': REPORT['uuid-1']['eth1']},
+                             report.node('uuid-1', 'eth1'))
+            self.assertIsNone(report.node('uuid-4'))
+        self.assertEqual(REPORT, binreport.load_report(path))
+
+    def test_binary(self):
+        path = self.write(REPORT)
+        with binreport.open_report(path) as report:
+            self.assertIsInstance(report, binreport.BinaryReport)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,288 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import binascii
+import struct
+import time
+import unittest
+
+from lldpreport import lldp
+
+
+def _hex(text):
+    return binascii.hexlify(text.encode('utf-8')).decode()
+
+
+# One TLV per TLV_SPEC entry: the TLV type, its payload in hex and the
+# field values it decodes to. Organizationally specific payloads start
+# with the OUI and subtype.
+CORPUS = [
+    (lldp.LLDP_TYPE_END, '', {}),
+    (lldp.LLDP_TLV_TYPE_CHASSIS_ID, '04' + '001122334455',
+     {'switch_chassis_id': '0:11:22:33:44:55'}),
+    (lldp.LLDP_TLV_TYPE_PORT_ID, '05' + _hex('Eth1/1'),
+     {'switch_port_id': 'Eth1/1'}),
+    (lldp.LLDP_TYPE_TTL, '0078', {'switch_ttl': '120'}),
+    (lldp.LLDP_TYPE_PORT_DESCRIPTION, _hex('uplink'),
+     {'switch_port_description': 'uplink'}),
+    (lldp.LLDP_TYPE_SYS_NAME, _hex('sw1.example.com'),
+     {'switch_system_name': 'sw1.example.com'}),
+    (lldp.LLDP_TYPE_SYS_DESCRIPTION, _hex('Switch OS 1.0'),
+     {'switch_system_description': 'Switch OS 1.0'}),
+    (lldp.LLDP_TYPE_SYS_CAPABILITIES, '0014' + '0004',
+     {'switch_system_capabilities': ('Bridge', 'Router')}),
+    (lldp.LLDP_TYPE_MGMT_ADDRESS, '05' + '01' + 'c0a80001' + '020000000100',
+     {'switch_management_address': '192.168.0.1'}),
+
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '01' + '0064',
+     {'switch_port_untagged_vlan_id': '100'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '02' + '06' + '00c8',
+     {'switch_port_protocol_vlan_id': '200'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '03' + '0064' + '04' +
+     _hex('test'),
+     {'switch_port_vlan_name_and_id': 'test (100)'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '04' + '03' + _hex('stp'),
+     {'switch_protocol_identify': 'stp'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '05' + 'deadbeef',
+     {'switch_port_vid_usage_digest': 'deadbeef'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '06' + '0010',
+     {'switch_port_management_vlanid': '16'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '07' + '03' + '00010010',
+     {'switch_port_link_aggregation_support': 'True',
+      'switch_port_link_aggregation_enabled': 'True',
+      'switch_port_link_aggregation_id': '65552'}),
+
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '01' + '03' + '6c01' + '001e',
+     {'switch_port_autonegotiation_support': 'True',
+      'switch_port_autonegotiation_enabled': 'True',
+      'switch_port_physical_capabilities': (
+          '10BASE-T hdx', '10BASE-T fdx', '100BASE-TX hdx',
+          '100BASE-TX fdx', '1000BASE-T fdx'),
+      'switch_port_mau_type': '1000BASE - T full duplex'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '02' + '07' + '01' + '02',
+     {'switch_port_mdi_power_support': (
+         'PSE', 'MDI power supported', 'MDI power enabled'),
+      'switch_port_mdi_power_pair': 'signal',
+      'switch_port_mdi_power_class': 'class 1'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '03' + '01' + '00000005',
+     {'switch_port_link_aggregation_support': 'True',
+      'switch_port_link_aggregation_enabled': 'False',
+      'switch_port_link_aggregation_id': '5'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '04' + '2328',
+     {'switch_port_mtu': '9000'}),
+
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '01' + '0027' + '04',
+     {'switch_port_med_capabilities': (
+         'inventory', 'location', 'network policy',
+         'LLDP_MED capabilities'),
+      'switch_port_med_device_type': 'Network connectivity'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '02' + '01' + '40c96e',
+     {'switch_port_med_network_policy':
+      'voice: vlan 100 tagged, priority 5, dscp 46'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '03' + '03' +
+     _hex('1234567890'),
+     {'switch_port_med_location': 'ELIN: 1234567890'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '04' + '51' + '00c8',
+     {'switch_port_med_power': 'PD, PSE source, critical priority, '
+                               '20.0 W'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '05' + _hex('r1'),
+     {'switch_hardware_revision': 'r1'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '06' + _hex('fw2'),
+     {'switch_firmware_revision': 'fw2'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '07' + _hex('sw3'),
+     {'switch_software_revision': 'sw3'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '08' + _hex('SN123'),
+     {'switch_serial_number': 'SN123'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '09' + _hex('Acme'),
+     {'switch_manufacturer_name': 'Acme'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '0a' + _hex('X100'),
+     {'switch_model_name': 'X100'}),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '0b' + _hex('asset-7'),
+     {'switch_asset_id': 'asset-7'}),
+
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '009069' + '01' + _hex('JN1234'),
+     {'switch_vendor_chassis_identifier': 'JN1234'}),
+]
+
+# TLVs shorter than their fixed-width fields
+TRUNCATED = [
+    (lldp.LLDP_TYPE_TTL, '00'),
+    (lldp.LLDP_TYPE_SYS_CAPABILITIES, '0014'),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '07' + '03' + '0001'),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '01' + '03' + '6c01' + '00'),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '04' + '23'),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0012bb' + '04' + '51' + '00'),
+]
+
+# TLV types, OUIs and subtypes that are not decoded
+UNKNOWN = [
+    (9, _hex('reserved')),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '7f' + '00'),
+    (lldp.LLDP_TYPE_ORG_SPECIFIC, 'abcdef' + '01' + '00'),
+]
+
+
+def _decode(tlv_type, payload):
+    return lldp.decode_tlv(tlv_type,
+                           bytearray(binascii.unhexlify(payload)))
+
+
+class TestDecodeCorpus(unittest.TestCase):
+
+    def test_corpus_covers_spec(self):
+        keys = set()
+        for tlv_type, payload, expected in CORPUS:
+            data = bytearray(binascii.unhexlify(payload))
+            if tlv_type == lldp.LLDP_TYPE_ORG_SPECIFIC:
+                keys.add(bytes(data[0:4]))
+            else:
+                keys.add(tlv_type)
+        self.assertEqual(set(lldp.TLV_DECODERS), keys)
+
+    def test_corpus(self):
+        for tlv_type, payload, expected in CORPUS:
+            decoded = _decode(tlv_type, payload)
+            self.assertEqual(
+                expected, dict((tlv.field, tlv.value) for tlv in decoded),
+                "TLV %d %s" % (tlv_type, payload))
+
+    def test_truncated(self):
+        for tlv_type, payload in TRUNCATED:
+            self.assertRaises(ValueError, _decode, tlv_type, payload)
+
+    def test_unknown(self):
+        for tlv_type, payload in UNKNOWN:
+            self.assertIsNone(_decode(tlv_type, payload))
+
+    def test_mdi_power_class_invalid(self):
+        decoded = _decode(lldp.LLDP_TYPE_ORG_SPECIFIC,
+                          '00120f' + '02' + '07' + '01' + '00')
+        self.assertEqual('Unknown (0)', decoded[2].value)
+
+    def test_med_power_sources(self):
+        for power, expected in (
+                ('11', 'PSE, primary source, critical priority, 20.0 W'),
+                ('21', 'PSE, backup source, critical priority, 20.0 W'),
+                ('61', 'PD, local source, critical priority, 20.0 W'),
+                ('71', 'PD, PSE and local source, critical priority, '
+                       '20.0 W'),
+                ('b1', 'reserved, reserved source, critical priority, '
+                       '20.0 W')):
+            decoded = _decode(lldp.LLDP_TYPE_ORG_SPECIFIC,
+                              '0012bb' + '04' + power + '00c8')
+            self.assertEqual(expected, decoded[0].value)
+
+    def test_errors_collected(self):
+        reporter = lldp.LldpReporter()
+        interface_data = [{
+            'name': 'eth0',
+            'mac_address': '52:54:00:00:00:01',
+            'lldp': [[lldp.LLDP_TYPE_SYS_NAME, _hex('sw1')],
+                     [lldp.LLDP_TYPE_TTL, '00'],
+                     [9, '00'],
+                     [lldp.LLDP_TLV_TYPE_PORT_ID, 'not hex'],
+                     [1]],
+        }, {
+            'mac_address': '52:54:00:00:00:02',
+            'lldp': [[lldp.LLDP_TYPE_SYS_NAME, _hex('sw1')]],
+        }]
+        interfaces = reporter.get_lldp_interface_data(interface_data, 'node')
+        self.assertEqual(['eth0'], list(interfaces))
+        fields = [tlv.field for tlv in interfaces['eth0']]
+        self.assertEqual(['interface_mac_address', 'switch_system_name'],
+                         fields)
+        self.assertEqual(4, reporter.errors.error_count)
+        self.assertEqual(1, len(reporter.errors.nodes['node']['errors']))
+        self.assertEqual(1, reporter.errors.unknown_count)
+
+
+class TestBulkDecoder(unittest.TestCase):
+
+    def _decode(self):
+        lldp_data = [[tlv_type, payload]
+                     for tlv_type, payload, expected in CORPUS
+                     if tlv_type == lldp.LLDP_TYPE_ORG_SPECIFIC]
+        decoder = lldp.BulkDecoder()
+        decoder.add_interfaces('node', [{'name': 'eth0', 'lldp': lldp_data},
+                                        {'name': 'eth1', 'lldp': lldp_data}])
+        return decoder.decode()
+
+    def test_matches_tlv_classes(self):
+        columns = self._decode()
+        self.assertEqual(lldp.BULK_FIELDS, set(columns))
+        for tlv_type, payload, expected in CORPUS:
+            for field, value in expected.items():
+                if field not in lldp.BULK_FIELDS:
+                    continue
+                if field.startswith('switch_port_link_aggregation'):
+                    # 802.1 and 802.3 TLVs share their fields
+                    self.assertIn(value, columns[field].values)
+                    continue
+                self.assertEqual(
+                    [(('node', 'eth0'), value), (('node', 'eth1'), value)],
+                    sorted(columns[field].items()))
+
+    def test_group(self):
+        column = self._decode()['switch_port_untagged_vlan_id']
+        self.assertEqual({'100': [('node', 'eth0'), ('node', 'eth1')]},
+                         dict(column.group()))
+
+    def test_iter_unpack(self):
+        unpacker = struct.Struct('>BH')
+        packed = b'\x01\x00\x02\x03\x00\x04'
+        self.assertEqual([(1, 2), (3, 4)],
+                         list(lldp._iter_unpack(unpacker, packed)))
+
+    def test_truncated(self):
+        errors = lldp.DecodeErrors()
+        decoder = lldp.BulkDecoder(errors)
+        decoder.add_interfaces('node', [{
+            'name': 'eth0',
+            'lldp': [[lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '04' + '23']],
+        }])
+        self.assertEqual({}, decoder.decode())
+        self.assertEqual(1, errors.error_count)
+
+
+    def test_malformed_interfaces(self):
+        errors = lldp.DecodeErrors()
+        decoder = lldp.BulkDecoder(errors)
+        decoder.add_interfaces('node', [
+            {'lldp': [[lldp.LLDP_TYPE_ORG_SPECIFIC,
+                       '00120f' + '04' + '2328']]},
+            {'name': 'eth0', 'lldp': [[1]]},
+        ])
+        self.assertEqual({}, decoder.decode())
+        self.assertEqual(2, errors.error_count)
+
+
+class TestDecodeThroughput(unittest.TestCase):
+
+    # A deliberately low floor, to catch order of magnitude regressions
+    # without failing on slow test machines
+    MIN_TLVS_PER_SECOND = 5000
+
+    def test_throughput(self):
+        tlvs = [(tlv_type, bytearray(binascii.unhexlify(payload)))
+                for tlv_type, payload, expected in CORPUS] * 200
+        start = time.time()
+        for tlv_type, data in tlvs:
+            lldp.decode_tlv(tlv_type, data)
+        elapsed = max(time.time() - start, 1e-6)
+        self.assertGreater(len(tlvs) / elapsed, self.MIN_TLVS_PER_SECOND)
+
+
+if __name__ == '__main__':
+    unittest.main()
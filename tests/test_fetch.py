@@ -0,0 +1,189 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import threading
+import time
+import unittest
+
+from lldpreport import fetch
+from lldpreport import lldp
+from tests import httpstub
+from tests.httpstub import StubHTTPError
+
+
+class StubInspector(httpstub.StubServer):
+    """Local inspector stub serving introspection data.
+
+    The first failures requests are answered with failure_status, and
+    every request takes delay seconds.
+    """
+
+    def __init__(self):
+        httpstub.StubServer.__init__(self, InspectorHandler)
+        self.failures = 0
+        self.failure_status = 503
+        self.delay = 0.0
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def get_data(self, node_id):
+        return self.get('/v1/introspection/%s/data' % node_id)
+
+
+class InspectorHandler(httpstub.StubHandler):
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+            failing = server.failures > 0
+            if failing:
+                server.failures -= 1
+        try:
+            time.sleep(server.delay)
+            if failing:
+                self.send_response(server.failure_status)
+                self.end_headers()
+                return
+            self.send_json({'inventory': {'interfaces': []}})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+class TestFetchScheduler(httpstub.StubServerTestCase):
+
+    def setUp(self):
+        self.inspector = self.start_server(StubInspector())
+
+    def scheduler(self, **kwargs):
+        kwargs.setdefault('backoff_base', 0.01)
+        kwargs.setdefault('rate', 1000.0)
+        kwargs.setdefault('burst', 1000)
+        return fetch.FetchScheduler(**kwargs)
+
+    def call(self, scheduler, node_id='node'):
+        return scheduler.call(self.inspector.url, self.inspector.get_data,
+                              node_id)
+
+    def test_retry(self):
+        self.inspector.failures = 2
+        data = self.call(self.scheduler())
+        self.assertEqual({'inventory': {'interfaces': []}}, data)
+        self.assertEqual(3, self.inspector.requests)
+
+    def test_retries_exhausted(self):
+        self.inspector.failures = 10
+        self.assertRaises(StubHTTPError, self.call,
+                          self.scheduler(retries=2))
+        self.assertEqual(3, self.inspector.requests)
+
+    def test_not_retryable(self):
+        self.inspector.failures = 1
+        self.inspector.failure_status = 404
+        scheduler = self.scheduler()
+        self.assertRaises(StubHTTPError, self.call, scheduler)
+        self.assertEqual(1, self.inspector.requests)
+        # The endpoint answered, so the circuit stays closed
+        breaker = scheduler.endpoint(self.inspector.url).breaker
+        self.assertIsNone(breaker.opened)
+
+    def test_breaker_waits_for_trial(self):
+        self.inspector.failures = 2
+        scheduler = self.scheduler(retries=0)
+        breaker = scheduler.endpoint(self.inspector.url).breaker
+        breaker.threshold = 2
+        breaker.reset_timeout = 0.3
+
+        for i in range(2):
+            self.assertRaises(StubHTTPError, self.call, scheduler)
+        self.assertIsNotNone(breaker.opened)
+
+        # Requests wait for the circuit instead of failing at once
+        start = time.time()
+        self.call(scheduler)
+        self.assertGreaterEqual(time.time() - start, 0.2)
+        self.assertIsNone(breaker.opened)
+        self.assertEqual(3, self.inspector.requests)
+
+    def test_breaker_max_wait(self):
+        self.inspector.failures = 2
+        scheduler = self.scheduler(retries=0, max_wait=0.1)
+        breaker = scheduler.endpoint(self.inspector.url).breaker
+        breaker.threshold = 2
+        breaker.reset_timeout = 30.0
+
+        for i in range(2):
+            self.assertRaises(StubHTTPError, self.call, scheduler)
+        self.assertRaises(fetch.CircuitOpenError, self.call, scheduler)
+        self.assertEqual(2, self.inspector.requests)
+
+    def test_rate_limit(self):
+        scheduler = self.scheduler(rate=20.0, burst=2)
+        start = time.time()
+        for i in range(10):
+            self.call(scheduler, 'node-%d' % i)
+        # Two requests use the burst, the other eight wait for tokens
+        self.assertGreaterEqual(time.time() - start, 0.35)
+        self.assertEqual(10, self.inspector.requests)
+
+    def test_concurrency_cap(self):
+        self.inspector.delay = 0.05
+        scheduler = self.scheduler(concurrency=2)
+        threads = [threading.Thread(target=self.call,
+                                    args=(scheduler, 'node-%d' % i))
+                   for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(8, self.inspector.requests)
+        self.assertLessEqual(self.inspector.max_in_flight, 2)
+
+    def test_observe(self):
+        self.inspector.failures = 1
+        observed = []
+        scheduler = self.scheduler()
+        scheduler.observe = lambda name, seconds, success: observed.append(
+            (name, success))
+        self.call(scheduler)
+        self.assertEqual([(self.inspector.url, False),
+                          (self.inspector.url, True)], observed)
+
+
+class FailingReporter(lldp.LldpReporter):
+
+    def get_ironic_lldp_data(self, node_id, keystone_client):
+        if node_id == 'bad':
+            raise StubHTTPError(503)
+        return {'inventory': {'interfaces': []}}
+
+
+class TestDecodePipeline(unittest.TestCase):
+
+    def test_failed_node_skipped(self):
+        reporter = FailingReporter()
+        report = lldp.DecodePipeline(reporter, None).run(['good', 'bad'])
+        self.assertEqual({'good': {}}, report)
+        self.assertEqual(set(['bad']), reporter.failed_nodes)
+        self.assertEqual(1, len(reporter.errors.nodes['bad']['errors']))
+
+
+if __name__ == '__main__':
+    unittest.main()
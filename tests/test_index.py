@@ -0,0 +1,147 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from lldpreport import index
+from lldpreport import lldp
+
+
+def _bindings(mac, port):
+    return {'eth0': {'interface_mac_address': mac,
+                     'switch_system_name': 'sw1',
+                     'switch_port_id': port}}
+
+
+REPORT = {
+    'uuid-1': _bindings('52:54:00:00:00:01', 'Eth1/1'),
+    'uuid-2': _bindings('52:54:00:00:00:02', 'Eth1/2'),
+}
+
+
+class TestLookupRefresh(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'index.json')
+        self.lookup = lldp.Lookup(None, None)
+        report_index = index.ReportIndex(self.path).load()
+        self.lookup.refresh(report_index, REPORT,
+                            {'uuid-1': 'node-1', 'uuid-2': 'node-2'})
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_file_keeps_names(self):
+        report_index = index.ReportIndex(self.path).load()
+        self.lookup.refresh(report_index, {
+            'uuid-1': _bindings('52:54:00:00:00:01', 'Eth1/3')})
+
+        report_index = index.ReportIndex(self.path).load()
+        self.assertEqual('uuid-1', report_index.node_uuid('node-1'))
+        self.assertEqual([('uuid-1', 'eth0')],
+                         report_index.by_switch_port('sw1', 'Eth1/3'))
+        # A partial report does not prune the other nodes
+        self.assertEqual('uuid-2', report_index.node_uuid('node-2'))
+
+    def test_refresh_prunes_missing(self):
+        reporter = lldp.FederatedReporter([])
+        reporter.inspected['uuid-1'] = None
+        report_index = index.ReportIndex(self.path).load()
+        self.lookup.refresh(report_index, {'uuid-1': REPORT['uuid-1']},
+                            {'uuid-1': 'node-1'}, reporter.node_missing)
+
+        report_index = index.ReportIndex(self.path).load()
+        self.assertEqual(['uuid-1'], list(report_index.nodes))
+        self.assertIsNone(report_index.by_mac('52:54:00:00:00:02'))
+
+    def test_refresh_keeps_failed_region(self):
+        reporter = lldp.FederatedReporter([])
+        reporter.inspected.update({'uuid-1': None, 'uuid-2': None})
+        reporter.failed_regions.add('east')
+        report_index = index.ReportIndex(self.path).load()
+        self.lookup.refresh(report_index, {
+            'east/uuid-3': _bindings('52:54:00:00:00:03', 'Eth1/3')})
+        self.lookup.refresh(report_index, {}, {}, reporter.node_missing)
+
+        report_index = index.ReportIndex(self.path).load()
+        self.assertEqual(['east/uuid-3', 'uuid-1', 'uuid-2'],
+                         sorted(report_index.nodes))
+
+
+class TestIndexLookups(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'index.json')
+        report_index = index.ReportIndex(self.path).load()
+        for node_id, interfaces in REPORT.items():
+            report_index.update_node(node_id, node_id.replace('uuid', 'node'),
+                                     interfaces)
+        interfaces = _bindings('52:54:00:00:00:03', 'Eth1/1')
+        interfaces['eth1'] = {'interface_mac_address': '52:54:00:00:00:04'}
+        report_index.update_node('uuid-3', 'node-3', interfaces)
+        report_index.save()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_lookups(self):
+        # The index itself is not read by lookups
+        os.remove(self.path)
+        with index.IndexLookups(self.path) as lookups:
+            self.assertEqual([{
+                'node': 'uuid-2', 'name': 'node-2', 'interface': 'eth0',
+                'mac': '52:54:00:00:00:02', 'switch': 'sw1',
+                'port': 'Eth1/2',
+            }], lookups.by_mac('52-54-00-00-00-02'))
+            self.assertEqual(
+                [('uuid-1', 'eth0'), ('uuid-3', 'eth0')],
+                [(entry['node'], entry['interface'])
+                 for entry in lookups.by_switch_port('sw1', 'Eth1/1')])
+            self.assertEqual(
+                ['eth0', 'eth1'],
+                [entry['interface']
+                 for entry in lookups.by_node_name('node-3')])
+
+            self.assertEqual([], lookups.by_mac('52:54:00:00:00:09'))
+            self.assertEqual([], lookups.by_switch_port('sw1', None))
+            self.assertEqual([], lookups.by_switch_port('sw2', 'Eth1/1'))
+            self.assertEqual([], lookups.by_node_name('node-9'))
+
+    def test_tables_follow_refresh(self):
+        report_index = index.ReportIndex(self.path).load()
+        report_index.remove_node('uuid-1')
+        report_index.save()
+        with index.open_lookups(self.path) as lookups:
+            self.assertEqual([], lookups.by_node_name('node-1'))
+            self.assertEqual(['uuid-3'],
+                             [entry['node'] for entry in
+                              lookups.by_switch_port('sw1', 'Eth1/1')])
+
+    def test_missing_tables_written(self):
+        os.remove(index.lookup_path(self.path))
+        with index.open_lookups(self.path) as lookups:
+            self.assertEqual(['uuid-1'],
+                             [entry['node'] for entry in
+                              lookups.by_mac('52:54:00:00:00:01')])
+
+    def test_no_index(self):
+        path = os.path.join(self.tmpdir, 'missing.json')
+        with index.open_lookups(path) as lookups:
+            self.assertEqual([], lookups.by_node_name('node-1'))
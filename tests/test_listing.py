@@ -0,0 +1,216 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import argparse
+import time
+import unittest
+
+try:
+    from urllib.parse import parse_qs, urlparse
+except ImportError:
+    from urlparse import parse_qs, urlparse
+
+from lldpreport import fetch
+from lldpreport import lldp
+from tests import httpstub
+
+# An untagged VLAN and MTU TLV on each interface
+LLDP_DATA = [[lldp.LLDP_TYPE_ORG_SPECIFIC, '0080c2' + '01' + '0064'],
+             [lldp.LLDP_TYPE_ORG_SPECIFIC, '00120f' + '04' + '2328']]
+
+
+class StubIronic(httpstub.StubServer):
+    """Local stub of the ironic node list and inspector data APIs.
+
+    Node list pages are capped at max_limit nodes, like ironic's
+    api.max_limit, and each page takes page_delay seconds.
+    """
+
+    def __init__(self, node_count, max_limit=1000, page_delay=0.0):
+        httpstub.StubServer.__init__(self, StubIronicHandler)
+        self.node_ids = ['%08d-0000-0000-0000-000000000000' % i
+                         for i in range(node_count)]
+        self.max_limit = max_limit
+        self.page_delay = page_delay
+        self.pages = 0
+
+    def get_data(self, node_id):
+        return self.get('/v1/introspection/%s/data' % node_id)
+
+
+class StubIronicHandler(httpstub.StubHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == '/v1/nodes':
+            self.send_json(self.node_page(parse_qs(url.query)))
+        else:
+            self.send_json({'inventory': {'interfaces': [
+                {'name': 'eth0', 'lldp': LLDP_DATA},
+                {'name': 'eth1', 'lldp': LLDP_DATA}]}})
+
+    def node_page(self, query):
+        server = self.server
+        with server.lock:
+            server.pages += 1
+        time.sleep(server.page_delay)
+        start = 0
+        if 'marker' in query:
+            start = server.node_ids.index(query['marker'][0]) + 1
+        limit = min(int(query['limit'][0]), server.max_limit)
+        return {'nodes': [{'uuid': node_id, 'name': 'node-%s' % node_id[:8]}
+                          for node_id in server.node_ids[start:start + limit]]}
+
+
+class StubNode(object):
+
+    def __init__(self, uuid, name):
+        self.uuid = uuid
+        self.name = name
+
+
+class StubNodeManager(object):
+    """The node.list of the ironic client, against the stub."""
+
+    def __init__(self, server):
+        self.server = server
+
+    def list(self, marker=None, limit=None, fields=None):
+        path = '/v1/nodes?limit=%d' % limit
+        if marker is not None:
+            path += '&marker=%s' % marker
+        return [StubNode(node['uuid'], node['name'])
+                for node in self.server.get(path)['nodes']]
+
+
+class StubIronicClient(object):
+
+    def __init__(self, server):
+        self.node = StubNodeManager(server)
+
+
+class StubReporter(lldp.LldpReporter):
+
+    def __init__(self, server):
+        lldp.LldpReporter.__init__(self)
+        self.server = server
+        self.scheduler = fetch.FetchScheduler(rate=10000.0, burst=10000)
+
+    def get_clients(self, argv):
+        return StubIronicClient(self.server), None
+
+    def get_ironic_lldp_data(self, node_id, keystone_client):
+        return self.scheduler.call(self.server.url, self.server.get_data,
+                                   node_id)
+
+
+def _argv():
+    return argparse.Namespace(node=None, interface=None)
+
+
+class StubIronicTestCase(httpstub.StubServerTestCase):
+
+    def start(self, *args, **kwargs):
+        self.ironic = self.start_server(StubIronic(*args, **kwargs))
+        return StubReporter(self.ironic)
+
+
+class TestNodeListing(StubIronicTestCase):
+
+    def test_max_limit_below_page_size(self):
+        reporter = self.start(250, max_limit=30)
+        nodes = list(reporter.iter_nodes(StubIronicClient(self.ironic)))
+        self.assertEqual(self.ironic.node_ids, [node.uuid for node in nodes])
+        # Nine pages of nodes and the empty page ending the list
+        self.assertEqual(10, self.ironic.pages)
+
+    def test_full_report(self):
+        reporter = self.start(250, max_limit=30)
+        report = reporter.get_full_report(_argv())
+        self.assertEqual(set(self.ironic.node_ids), set(report))
+        self.assertEqual(set(['eth0', 'eth1']),
+                         set(report[self.ironic.node_ids[-1]]))
+        self.assertEqual('node-00000249',
+                         reporter.node_names[self.ironic.node_ids[-1]])
+
+    def test_bulk_decode(self):
+        reporter = self.start(250, max_limit=30)
+        columns = reporter.bulk_decode(_argv())
+        self.assertEqual(500, len(columns['switch_port_mtu']))
+        self.assertEqual(set(['9000']),
+                         set(columns['switch_port_mtu'].values))
+
+
+class PartialReporter(StubReporter):
+    """Fails to fetch the first node and finds no inventory on the second."""
+
+    def get_ironic_lldp_data(self, node_id, keystone_client):
+        node_ids = self.server.node_ids
+        if node_id == node_ids[0]:
+            raise IOError("inspector unreachable")
+        if node_id == node_ids[1]:
+            return {}
+        return StubReporter.get_ironic_lldp_data(self, node_id,
+                                                 keystone_client)
+
+
+class TestInterfaceLists(StubIronicTestCase):
+
+    def test_interface_lists(self):
+        reporter = self.start(250, max_limit=30)
+        report = reporter.get_interface_lists(_argv())
+        self.assertEqual(set(self.ironic.node_ids), set(report))
+        self.assertEqual(['eth0', 'eth1'], report[self.ironic.node_ids[0]])
+
+    def test_failed_nodes(self):
+        self.start(10)
+        reporter = PartialReporter(self.ironic)
+        report = reporter.get_interface_lists(_argv())
+        node_ids = self.ironic.node_ids
+        self.assertEqual(set(node_ids[1:]), set(report))
+        self.assertEqual([], report[node_ids[1]])
+        self.assertEqual(set(node_ids[:1]), reporter.failed_nodes)
+        self.assertEqual(2, reporter.errors.error_count)
+
+
+class TestListingBenchmark(StubIronicTestCase):
+    """Time to the first node and to the full report of a paged list.
+
+    Nodes are fetched while later pages of the node list load, so the
+    first node is reported after about one page rather than the whole
+    list.
+    """
+
+    NODE_COUNT = 1000
+    PAGE_DELAY = 0.02
+
+    def test_time_to_first_node(self):
+        reporter = self.start(self.NODE_COUNT, page_delay=self.PAGE_DELAY)
+        start = time.time()
+        report = reporter.iter_full_report(_argv())
+        next(report)
+        first = time.time() - start
+        count = 1 + sum(1 for item in report)
+        total = time.time() - start
+
+        self.assertEqual(self.NODE_COUNT, count)
+        pages = self.NODE_COUNT // lldp.NODE_PAGE_SIZE
+        self.assertLess(first, total / 2,
+                        "first node after %.3fs of %.3fs" % (first, total))
+        self.assertGreater(total, pages * self.PAGE_DELAY)
+
+
+if __name__ == '__main__':
+    unittest.main()
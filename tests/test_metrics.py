@@ -0,0 +1,111 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import unittest
+
+from lldpreport import metrics
+
+
+def _bindings(switch, vlans=None, mtu=None):
+    bindings = {'switch_system_name': switch}
+    if vlans is not None:
+        bindings['switch_port_vlans'] = vlans
+    if mtu is not None:
+        bindings['switch_port_mtu'] = mtu
+    return bindings
+
+
+class TestFleetMetrics(unittest.TestCase):
+
+    def setUp(self):
+        self.fleet = metrics.FleetMetrics()
+        self.fleet.update_node('node-1', {
+            'eth0': _bindings('sw1', ['100', '200'], '9000'),
+            'eth1': _bindings('sw2', ['100'], '1500'),
+        })
+        self.fleet.update_node('node-2', {
+            'eth0': _bindings('sw1', ['100'], '9000'),
+            'eth1': {},
+        })
+
+    def test_counts(self):
+        self.assertEqual({'sw1': 2, 'sw2': 1}, dict(self.fleet.switch_ports))
+        self.assertEqual({'100': 3, '200': 1},
+                         dict(self.fleet.vlan_interfaces))
+
+    def test_unchanged_node(self):
+        self.assertFalse(self.fleet.update_node('node-2', {
+            'eth0': _bindings('sw1', ['100'], '9000'),
+            'eth1': {},
+        }))
+
+    def test_incremental_updates(self):
+        self.assertTrue(self.fleet.update_node('node-1', {
+            'eth0': _bindings('sw2', ['300'], '1500'),
+        }))
+        self.assertEqual(1, self.fleet.switch_ports['sw1'])
+        self.assertEqual(1, self.fleet.switch_ports['sw2'])
+        self.assertEqual(1, self.fleet.vlan_interfaces['100'])
+        self.assertEqual(0, self.fleet.vlan_interfaces['200'])
+        self.assertEqual(1, self.fleet.vlan_interfaces['300'])
+
+        self.fleet.remove_node('node-1')
+        self.fleet.remove_node('node-2')
+        self.fleet.remove_node('node-3')
+        self.assertEqual({}, self.fleet.nodes)
+        self.assertEqual(set([0]), set(self.fleet.switch_ports.values()))
+        self.assertEqual(set([0]), set(self.fleet.vlan_interfaces.values()))
+        self.assertEqual({}, self.fleet.mtu_mismatches())
+
+    def test_mtu_mismatches(self):
+        self.fleet.update_node('node-3', {
+            'eth0': _bindings('sw1', mtu='1500'),
+            'eth1': _bindings('sw1', mtu='9000'),
+            'eth2': _bindings('sw2'),
+        })
+        self.assertEqual({'sw1': 1, 'sw2': 0}, self.fleet.mtu_mismatches())
+
+    def test_render(self):
+        self.fleet.decode_errors = 2
+        self.fleet.observe_fetch('http://inspector', 0.2, True)
+        self.fleet.observe_fetch('http://inspector', 3.0, True)
+        lines = self.fleet.render().splitlines()
+
+        self.assertEqual(['# HELP lldp_nodes Nodes in the last LLDP report',
+                          '# TYPE lldp_nodes gauge',
+                          'lldp_nodes 2'], lines[:3])
+        self.assertIn('lldp_switch_ports{switch="sw1"} 2', lines)
+        self.assertIn('lldp_vlan_interfaces{vlan="100"} 3', lines)
+        self.assertIn('lldp_decode_errors 2', lines)
+        self.assertIn('# TYPE lldp_fetch_duration_seconds histogram', lines)
+        self.assertIn('lldp_fetch_duration_seconds_bucket'
+                      '{endpoint="http://inspector",le="0.25"} 1', lines)
+        self.assertIn('lldp_fetch_duration_seconds_bucket'
+                      '{endpoint="http://inspector",le="+Inf"} 2', lines)
+        self.assertIn('lldp_fetch_duration_seconds_count'
+                      '{endpoint="http://inspector"} 2', lines)
+
+        # Each family is typed once, before its samples
+        types = [line.split()[2] for line in lines
+                 if line.startswith('# TYPE')]
+        self.assertEqual(len(types), len(set(types)))
+        for line in lines:
+            if not line.startswith('#'):
+                name = line.split('{')[0].split()[0]
+                self.assertIn(metrics._family(name), types)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from lldpreport import snapshot
+
+ETH0 = {'switch_system_name': 'sw1', 'switch_port_id': 'Eth1/1'}
+ETH1 = {'switch_system_name': 'sw1', 'switch_port_id': 'Eth1/2'}
+MOVED = {'switch_system_name': 'sw2', 'switch_port_id': 'Eth1/1'}
+
+
+class TestSnapshotStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.store = snapshot.SnapshotStore(self.tmpdir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def object_files(self):
+        return [filename
+                for path, dirs, files in os.walk(self.store.objects_path)
+                for filename in files]
+
+    def test_bindings_stored_once(self):
+        report = {'uuid-1': {'eth0': ETH0, 'eth1': ETH1},
+                  'uuid-2': {'eth0': dict(ETH0)}}
+        self.store.save(report, '20160901T000000Z')
+        self.store.save(report, '20160902T000000Z')
+        self.assertEqual(2, len(self.object_files()))
+
+        self.store.save({'uuid-1': {'eth0': MOVED}}, '20160903T000000Z')
+        self.assertEqual(3, len(self.object_files()))
+        self.assertEqual(report, self.store.load('20160902T000000Z'))
+        self.assertEqual({'uuid-1': {'eth0': ETH0, 'eth1': ETH1}},
+                         self.store.load('20160901T000000Z', 'uuid-1'))
+
+    def test_keep_failed_nodes(self):
+        self.store.save({'uuid-1': {'eth0': ETH0},
+                         'uuid-2': {'eth0': ETH1}}, '20160901T000000Z')
+        self.store.save({'uuid-1': {'eth0': MOVED}}, '20160902T000000Z',
+                        keep=['uuid-2', 'uuid-3'])
+        self.assertEqual({'uuid-1': {'eth0': MOVED},
+                          'uuid-2': {'eth0': ETH1}},
+                         self.store.load('20160902T000000Z'))
+
+    def test_keep_without_snapshots(self):
+        self.store.save({'uuid-1': {'eth0': ETH0}}, '20160901T000000Z',
+                        keep=['uuid-2'])
+        self.assertEqual({'uuid-1': {'eth0': ETH0}},
+                         self.store.load('20160901T000000Z'))
+
+    def test_list(self):
+        self.assertEqual([], self.store.list())
+        names = ['20160831T235959Z', '20160901T000000Z', '20160915T120000Z',
+                 '20161001T000000Z']
+        for name in reversed(names):
+            self.store.save({}, name)
+
+        self.assertEqual(names, self.store.list())
+        self.assertEqual(names[1:3], self.store.list('201609', '201609'))
+        self.assertEqual(names[1:3],
+                         self.store.list('20160901', '20160915'))
+        self.assertEqual(names[2:], self.store.list(since='20160915'))
+        self.assertEqual(names[:2], self.store.list(until='20160901'))
+
+    def test_history(self):
+        self.store.save({'uuid-1': {'eth0': ETH0}}, '20160901T000000Z')
+        self.store.save({'uuid-1': {'eth0': ETH0, 'eth1': ETH1}},
+                        '20160902T000000Z')
+        self.store.save({'uuid-1': {'eth0': MOVED, 'eth1': ETH1}},
+                        '20160903T000000Z')
+        self.store.save({'uuid-1': {'eth0': MOVED}}, '20160904T000000Z')
+
+        self.assertEqual([
+            ('20160901T000000Z', 'uuid-1', 'eth0', None, ETH0),
+            ('20160902T000000Z', 'uuid-1', 'eth1', None, ETH1),
+            ('20160903T000000Z', 'uuid-1', 'eth0', ETH0, MOVED),
+            ('20160904T000000Z', 'uuid-1', 'eth1', ETH1, None),
+        ], list(self.store.history()))
+
+        # The first snapshot in range has every interface as added
+        self.assertEqual(
+            [('20160902T000000Z', 'uuid-1', 'eth0', None, ETH0),
+             ('20160903T000000Z', 'uuid-1', 'eth0', ETH0, MOVED)],
+            list(self.store.history('uuid-1', 'eth0',
+                                    since='20160902')))
+
+
+if __name__ == '__main__':
+    unittest.main()
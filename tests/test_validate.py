@@ -0,0 +1,95 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import binascii
+import unittest
+
+from lldpreport import lldp
+
+# Untagged VLAN 100, VLANs 100 and 200, MTU 9000 and link aggregation
+# enabled on port 5
+NATIVE_VLAN = '0080c2' + '01' + '0064'
+VLAN_100 = '0080c2' + '03' + '0064' + '04' + '74657374'
+VLAN_200 = '0080c2' + '03' + '00c8' + '04' + '70726f64'
+MTU = '00120f' + '04' + '2328'
+LAG = '0080c2' + '07' + '03' + '00000005'
+
+
+def _interface(*payloads):
+    obj_list = []
+    for payload in payloads:
+        obj_list.extend(lldp.decode_tlv(
+            lldp.LLDP_TYPE_ORG_SPECIFIC,
+            bytearray(binascii.unhexlify(payload))))
+    return obj_list
+
+
+class TestValidateAggregator(unittest.TestCase):
+
+    def validate(self, config, obj_list, failed_nodes=()):
+        aggregator = lldp.ValidateAggregator(
+            {'uuid-1': {'eth0': config}}, failed_nodes)
+        aggregator.add_node('uuid-1')
+        if obj_list is not None:
+            aggregator.add_interface('uuid-1', 'eth0', obj_list)
+        return [(m['check'], m['expected'], m['actual'])
+                for m in aggregator.result()]
+
+    def test_match(self):
+        config = {'vlans': [100, '200'], 'native_vlan': 100, 'mtu': 9000,
+                  'lag': 5}
+        self.assertEqual([], self.validate(config, _interface(
+            NATIVE_VLAN, VLAN_100, VLAN_200, MTU, LAG)))
+        self.assertEqual([], self.validate({'lag': True}, _interface(LAG)))
+
+    def test_mismatch(self):
+        config = {'vlans': [100, 300], 'native_vlan': 200, 'mtu': 1500,
+                  'lag': 6}
+        self.assertEqual([
+            ('lag', 6, 5),
+            ('mtu', 1500, 9000),
+            ('native_vlan', 200, 100),
+            ('vlans', [100, 300], [100, 200]),
+        ], self.validate(config, _interface(
+            NATIVE_VLAN, VLAN_100, VLAN_200, MTU, LAG)))
+
+    def test_missing_tlvs(self):
+        config = {'native_vlan': 100, 'mtu': 9000, 'lag': True}
+        self.assertEqual([
+            ('lag', True, False),
+            ('mtu', 9000, None),
+            ('native_vlan', 100, None),
+        ], self.validate(config, _interface()))
+
+    def test_lag_absent_is_not_aggregated(self):
+        self.assertEqual([], self.validate({'lag': False}, _interface(MTU)))
+        self.assertEqual([('lag', 5, None)],
+                         self.validate({'lag': 5}, _interface(MTU)))
+
+    def test_unchecked_keys(self):
+        self.assertEqual([], self.validate({}, _interface(MTU)))
+
+    def test_missing_interface(self):
+        self.assertEqual([('interface', 'present', None)],
+                         self.validate({'mtu': 9000}, None))
+
+    def test_fetch_failed(self):
+        self.assertEqual([('fetch_failed', 'fetched', None)],
+                         self.validate({'mtu': 9000}, None,
+                                       set(['uuid-1'])))
+
+
+if __name__ == '__main__':
+    unittest.main()
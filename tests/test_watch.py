@@ -0,0 +1,181 @@
+# Copyright 2016 Red Hat, Inc.
+# All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License. You may obtain
+# a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+# License for the specific language governing permissions and limitations
+# under the License.
+
+import argparse
+import unittest
+
+from lldpreport import lldp
+from lldpreport import watch
+
+ETH0 = {'switch_chassis_id': '0:11:22:33:44:55',
+        'switch_system_name': 'sw1',
+        'switch_port_id': 'Eth1/1',
+        'switch_port_vlans': ['100', '200'],
+        'switch_port_mtu': '9000'}
+
+
+def _changed(**fields):
+    bindings = dict(ETH0)
+    bindings.update(fields)
+    return bindings
+
+
+class TestDiffBindings(unittest.TestCase):
+
+    def test_unchanged(self):
+        self.assertEqual([], list(watch.diff_bindings(ETH0, dict(ETH0))))
+
+    def test_neighbor_changed(self):
+        events = list(watch.diff_bindings(
+            ETH0, _changed(switch_port_id='Eth1/2')))
+        self.assertEqual([('neighbor_changed', {
+            'old': {'switch_chassis_id': '0:11:22:33:44:55',
+                    'switch_system_name': 'sw1',
+                    'switch_port_id': 'Eth1/1'},
+            'new': {'switch_chassis_id': '0:11:22:33:44:55',
+                    'switch_system_name': 'sw1',
+                    'switch_port_id': 'Eth1/2'},
+        })], events)
+
+    def test_vlans(self):
+        events = list(watch.diff_bindings(
+            ETH0, _changed(switch_port_vlans=['200', '300'])))
+        self.assertEqual([('vlan_added', {'vlan': '300'}),
+                          ('vlan_removed', {'vlan': '100'})], events)
+
+    def test_mtu_changed(self):
+        events = list(watch.diff_bindings(
+            ETH0, _changed(switch_port_mtu='1500')))
+        self.assertEqual([('mtu_changed', {'old': '9000', 'new': '1500'})],
+                         events)
+
+    def test_bindings_changed(self):
+        events = list(watch.diff_bindings(
+            ETH0, _changed(switch_port_description='uplink')))
+        self.assertEqual(
+            [('bindings_changed', {'fields': ['switch_port_description']})],
+            events)
+
+
+class TestChangeTracker(unittest.TestCase):
+
+    def setUp(self):
+        self.tracker = watch.ChangeTracker()
+
+    def test_first_update(self):
+        self.assertEqual([], self.tracker.update_node(
+            'uuid-1', 'mark-1', {'eth0': ETH0}))
+        self.assertEqual([], self.tracker.update_node(
+            'uuid-1', 'mark-2', {'eth0': ETH0}))
+
+    def test_events(self):
+        self.tracker.update_node('uuid-1', 'mark-1', {'eth0': ETH0})
+        events = self.tracker.update_node('uuid-1', 'mark-2', {
+            'eth0': _changed(switch_port_mtu='1500'),
+            'eth1': ETH0,
+        })
+        self.assertEqual([
+            ('mtu_changed', 'uuid-1', 'eth0', {'old': '9000', 'new': '1500'}),
+            ('interface_added', 'uuid-1', 'eth1', {'new': ETH0}),
+        ], events)
+
+        events = self.tracker.update_node('uuid-1', 'mark-3', {'eth1': ETH0})
+        self.assertEqual([('interface_removed', 'uuid-1', 'eth0',
+                           {'old': _changed(switch_port_mtu='1500')})],
+                         events)
+
+        self.assertEqual([('node_removed', 'uuid-1', None, {})],
+                         self.tracker.remove_node('uuid-1'))
+        self.assertEqual([], self.tracker.remove_node('uuid-1'))
+
+    def test_stale_nodes(self):
+        self.tracker.update_node('uuid-1', 'mark-1', {'eth0': ETH0})
+        inspected = {'uuid-1': 'mark-1', 'uuid-2': 'mark-1'}
+        stale = self.tracker.stale_nodes(inspected)
+        self.assertNotIn('uuid-1', stale)
+        self.assertIn('uuid-2', stale)
+
+        inspected['uuid-1'] = 'mark-2'
+        self.assertIn('uuid-1', stale)
+
+
+class StubNode(object):
+
+    def __init__(self, uuid, inspection_finished_at):
+        self.uuid = uuid
+        self.name = None
+        self.inspection_finished_at = inspection_finished_at
+
+
+class StubNodeManager(object):
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+    def list(self, marker=None, limit=None, fields=None):
+        if marker is not None:
+            return []
+        return [StubNode(uuid, inspected)
+                for uuid, inspected in sorted(self.nodes.items())]
+
+
+class StubIronicClient(object):
+
+    def __init__(self, nodes):
+        self.node = StubNodeManager(nodes)
+
+
+class CountingReporter(lldp.LldpReporter):
+    """Reports on a fixed node list, counting the nodes fetched."""
+
+    def __init__(self, nodes, fetched):
+        lldp.LldpReporter.__init__(self)
+        self.nodes = nodes
+        self.fetched = fetched
+
+    def get_clients(self, argv):
+        return StubIronicClient(self.nodes), None
+
+    def get_ironic_lldp_data(self, node_id, keystone_client):
+        self.fetched.append(node_id)
+        return {'inventory': {'interfaces': []}}
+
+
+class TestStaleNodeFetch(unittest.TestCase):
+
+    def poll(self, tracker, nodes):
+        fetched = []
+        reporter = CountingReporter(nodes, fetched)
+        argv = argparse.Namespace(node=None, interface=None)
+        report, = reporter.aggregate(argv, [lldp.BindingsAggregator()],
+                                     tracker.stale_nodes(reporter.inspected))
+        for node_id, interfaces in report.items():
+            tracker.update_node(node_id, reporter.inspected.get(node_id),
+                                interfaces)
+        return sorted(fetched)
+
+    def test_refetch_when_inspected(self):
+        tracker = watch.ChangeTracker()
+        nodes = {'uuid-1': '2016-09-01T00:00:00', 'uuid-2': None}
+        self.assertEqual(['uuid-1', 'uuid-2'], self.poll(tracker, nodes))
+        self.assertEqual([], self.poll(tracker, nodes))
+
+        nodes['uuid-2'] = '2016-09-02T00:00:00'
+        self.assertEqual(['uuid-2'], self.poll(tracker, nodes))
+        self.assertEqual([], self.poll(tracker, nodes))
+
+
+if __name__ == '__main__':
+    unittest.main()